@@ -2,14 +2,17 @@
     Input/Output Operation For File System
 """
 
+import mmap
+import os
 import random
+import time
 from pathlib import Path
-from typing import List, Union
+from typing import Any, Iterator, List, Union
 
 import orjson
 
 
-__all__ = ("IO",)
+__all__ = ("IO", "JsonlWriter")
 
 
 class IO:
@@ -179,6 +182,99 @@ class IO:
             file.write("\n".join(file_content))
 
 
+    @classmethod
+    def iter_jsonl(
+        cls, file_name: Union[str, Path], use_mmap: bool = False
+    ) -> Iterator[Any]:
+        """iterate items from json lines file, optional memory-mapped"""
+        with open(file_name, "rb") as file:
+            if use_mmap:
+                if file.seek(0, 2) == 0:
+                    return
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    for line in iter(data.readline, b""):
+                        if line.strip():
+                            yield orjson.loads(line)
+            else:
+                for line in file:
+                    if line.strip():
+                        yield orjson.loads(line)
+
+    @classmethod
+    def load_jsonl(cls, file_name: Union[str, Path]) -> list:
+        """load list of items from json lines file"""
+        return list(cls.iter_jsonl(file_name))
+
+
+class JsonlWriter:
+    """Append-only json lines writer, flush on buffer size or time."""
+
+    def __init__(
+        self,
+        file_name: Union[str, Path],
+        flush_size: int = 1 << 20,
+        flush_seconds: float = 5.0,
+    ) -> None:
+        """Init writer, flush_size in bytes."""
+        self.file_name = Path(file_name)
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.flushed_at = time.monotonic()
+        self.count = 0
+
+        self.file_name.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.file_name, "ab")
+
+    def write(self, item: Any) -> None:
+        """append one item, dataclass supported"""
+        line = orjson.dumps(item) + b"\n"
+        self.buffer.append(line)
+        self.buffered += len(line)
+        self.count += 1
+        if (
+            self.buffered >= self.flush_size
+            or time.monotonic() - self.flushed_at >= self.flush_seconds
+        ):
+            self.flush()
+
+    def write_many(self, items: List[Any]) -> None:
+        """append list of items"""
+        for item in items:
+            self.write(item)
+
+    def flush(self) -> None:
+        """write buffered lines into file"""
+        if self.buffer:
+            self.file.write(b"".join(self.buffer))
+            self.file.flush()
+            self.buffer = []
+            self.buffered = 0
+        self.flushed_at = time.monotonic()
+
+    def commit(self) -> int:
+        """flush and fsync file, return committed file size in bytes"""
+        self.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self) -> None:
+        """flush and close file"""
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        """enter context"""
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """exit context, close file"""
+        self.close()
+
+
 class TestIO:
     """Test IO Operation."""
 
@@ -287,6 +383,21 @@ class TestIO:
         assert self.io.load_list_dict(file) == content
         assert self.io.file_del(file)
 
+    def test_save_load_jsonl(self) -> None:
+        """test JsonlWriter, iter_jsonl, load_jsonl"""
+        file = Path(self.dir_test, "test.file")
+        self.io.file_del(file)
+
+        content = [{"name": "Ben", "age": age} for age in range(10)]
+        with JsonlWriter(file, flush_size=64) as writer:
+            writer.write_many(content[:5])
+        with JsonlWriter(file, flush_seconds=0) as writer:
+            writer.write_many(content[5:])
+            assert writer.commit() == file.stat().st_size
+        assert self.io.load_jsonl(file) == content
+        assert list(self.io.iter_jsonl(file, use_mmap=True)) == content
+        assert self.io.file_del(file)
+
     def test_cleanup(self) -> None:
         """Test clean up test dir."""
         assert self.io.dir_del(dir_name=self.dir_test)
@@ -0,0 +1,235 @@
+"""
+    Staged Pipeline With Bounded Queues
+"""
+
+import threading
+import time
+from queue import Empty, Full, Queue
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+
+__all__ = ("Stage", "StagedPipeline")
+
+
+STOP = object()
+
+
+class Stage:
+    """Pipeline stage: function over a batch, run by a pool of worker threads."""
+
+    def __init__(
+        self, name: str, func: Callable[[list], list], workers: int = 1
+    ) -> None:
+        """Init stage, func maps list of items into list of items"""
+        self.name = name
+        self.func = func
+        self.workers = workers
+
+        self.lock = threading.Lock()
+        self.running = 0
+        self.items = 0
+        self.batches = 0
+        self.busy = 0.0
+        self.depth_sum = 0
+        self.depth_max = 0
+
+    def record(self, size: int, busy: float, depth: int) -> None:
+        """record metrics of one processed batch"""
+        with self.lock:
+            self.items += size
+            self.batches += 1
+            self.busy += busy
+            self.depth_sum += depth
+            self.depth_max = max(self.depth_max, depth)
+
+    def report(self, elapsed: float) -> dict:
+        """throughput and input queue depth of stage"""
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items": self.items,
+            "busy": round(self.busy, 4),
+            "items_per_busy_sec": round(self.items / self.busy, 2) if self.busy else 0.0,
+            "items_per_sec": round(self.items / elapsed, 2) if elapsed else 0.0,
+            "queue_depth_avg": round(self.depth_sum / self.batches, 2) if self.batches else 0.0,
+            "queue_depth_max": self.depth_max,
+        }
+
+
+class StagedPipeline:
+    """Run batches through stages connected by bounded queues.
+
+    Each stage has its own worker threads. A full queue blocks the stage
+    before it, so at most `maxsize` batches wait between two stages.
+    Results are yielded in input order. When the consumer stops early or
+    raises, the pipeline is stopped and its threads exit.
+    """
+
+    def __init__(self, stages: List[Stage], batch_size: int = 64, maxsize: int = 4) -> None:
+        """Init pipeline"""
+        self.stages = stages
+        self.batch_size = batch_size
+        self.maxsize = maxsize
+        self.started = 0.0
+        self.elapsed = 0.0
+        self.stop = threading.Event()
+        self.threads: List[threading.Thread] = []
+
+    def put(self, queue: Queue, task: Any) -> bool:
+        """put task into queue, False when pipeline stopped meanwhile"""
+        while not self.stop.is_set():
+            try:
+                queue.put(task, timeout=0.05)
+                return True
+            except Full:
+                continue
+        return False
+
+    def get(self, queue: Queue) -> Any:
+        """get task from queue, STOP when pipeline stopped meanwhile"""
+        while not self.stop.is_set():
+            try:
+                return queue.get(timeout=0.05)
+            except Empty:
+                continue
+        return STOP
+
+    def feed(self, items: Iterable[Any], queue: Queue) -> None:
+        """source thread: put numbered batches into first queue"""
+        seq = 0
+        batch: list = []
+        try:
+            for item in items:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    if not self.put(queue, (seq, batch)):
+                        return
+                    seq, batch = seq + 1, []
+            if batch:
+                self.put(queue, (seq, batch))
+        except Exception as err:  # pylint: disable=broad-except
+            self.put(queue, (-1, err))
+        for _ in range(self.stages[0].workers):
+            self.put(queue, STOP)
+
+    def work(self, index: int, src: Queue, dst: Queue) -> None:
+        """stage worker thread: apply stage func from src into dst"""
+        stage = self.stages[index]
+        while True:
+            depth = src.qsize()
+            task = self.get(src)
+            if task is STOP:
+                break
+            seq, batch = task
+            if not isinstance(batch, Exception):
+                start = time.perf_counter()
+                try:
+                    batch = stage.func(batch)
+                except Exception as err:  # pylint: disable=broad-except
+                    batch = err
+                stage.record(size=len(task[1]), busy=time.perf_counter() - start, depth=depth)
+            if not self.put(dst, (seq, batch)):
+                break
+
+        with stage.lock:
+            stage.running -= 1
+            last = stage.running == 0
+        if last:
+            after = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+            for _ in range(after):
+                self.put(dst, STOP)
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """yield processed items in input order"""
+        queues: List[Queue] = [Queue(maxsize=self.maxsize) for _ in range(len(self.stages) + 1)]
+        self.stop = threading.Event()
+        self.threads = threads = [threading.Thread(target=self.feed, args=(items, queues[0]), daemon=True)]
+        for index, stage in enumerate(self.stages):
+            stage.running = stage.workers
+            for _ in range(stage.workers):
+                threads.append(
+                    threading.Thread(
+                        target=self.work,
+                        args=(index, queues[index], queues[index + 1]),
+                        daemon=True,
+                    )
+                )
+
+        self.started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        pending: Dict[int, list] = {}
+        expect = 0
+        try:
+            while True:
+                task = queues[-1].get()
+                if task is STOP:
+                    break
+                seq, batch = task
+                if isinstance(batch, Exception):
+                    raise batch
+                pending[seq] = batch
+                while expect in pending:
+                    yield from pending.pop(expect)
+                    expect += 1
+                self.elapsed = time.perf_counter() - self.started
+        finally:
+            self.close()
+
+        self.elapsed = time.perf_counter() - self.started
+
+    def close(self) -> None:
+        """stop workers blocked on full or empty queues, wait for them to exit"""
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
+
+    def report(self) -> List[dict]:
+        """metrics per stage, the slowest stage has lowest items_per_sec with high queue depth"""
+        return [stage.report(self.elapsed) for stage in self.stages]
+
+
+class TestStagedPipeline:
+    """TestCase for StagedPipeline."""
+
+    @staticmethod
+    def test_order() -> None:
+        """Test output in input order with several workers per stage."""
+        stages = [
+            Stage("double", lambda xs: [x * 2 for x in xs], workers=3),
+            Stage("slow", lambda xs: time.sleep(0.001 * (xs[0] % 3)) or [x + 1 for x in xs], workers=2),
+        ]
+        pipeline = StagedPipeline(stages, batch_size=3, maxsize=2)
+        assert list(pipeline.run(range(100))) == [x * 2 + 1 for x in range(100)]
+        report = pipeline.report()
+        assert [item["items"] for item in report] == [100, 100]
+        assert all(item["queue_depth_max"] <= 2 for item in report)
+
+    @staticmethod
+    def test_error() -> None:
+        """Test error in stage raised in consumer."""
+
+        def fail(items: list) -> list:
+            if 5 in items:
+                raise ValueError("bad item")
+            return items
+
+        pipeline = StagedPipeline([Stage("fail", fail, workers=2)], batch_size=2)
+        try:
+            list(pipeline.run(range(10)))
+        except ValueError as err:
+            assert str(err) == "bad item"
+        else:
+            raise AssertionError("error not raised")
+        assert not any(thread.is_alive() for thread in pipeline.threads)
+
+    @staticmethod
+    def test_close() -> None:
+        """Test consumer stopping early stops workers blocked on full queues."""
+        stages = [Stage("same", lambda xs: xs, workers=2), Stage("same", lambda xs: xs, workers=2)]
+        pipeline = StagedPipeline(stages, batch_size=2, maxsize=1)
+        results = pipeline.run(range(1000))
+        assert [next(results) for _ in range(3)] == [0, 1, 2]
+        results.close()
+        assert not any(thread.is_alive() for thread in pipeline.threads)
@@ -15,6 +15,7 @@ class Config:
     dir_model = dir_dat / "model"
 
     dir_out = dir_app / "out"
+    dir_cache = dir_out / "cache"
     dir_debug = dir_out / "debug"
     dir_log = dir_out / "log"
     dir_tmp = dir_out / "tmp"
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""ONNX Runtime Backend for Transformer Classifiers."""
+
+# Reference:
+# - https://pytorch.org/docs/stable/onnx.html
+# - https://onnxruntime.ai/docs/performance/model-optimizations/quantization.html
+
+import inspect
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import torch
+
+from ..base.io import IO
+from ..config import Config
+
+
+__all__ = (
+    "BACKENDS",
+    "OnnxModel",
+    "get_model_id",
+    "softmax",
+)
+
+
+BACKENDS = ("torch", "onnx")
+
+
+class OnnxModel:
+    """Torch model exported once to ONNX and run by onnxruntime on CPU."""
+
+    config = Config()
+
+    def __init__(
+            self,
+            model: torch.nn.Module,
+            model_name: str,
+            input_names: tuple[str, ...],
+            quantize: bool = False,
+            dir_cache: Optional[Path] = None) -> None:
+        """Init, export model into cache directory if not exported yet.
+
+        The int8 file is quantized from the cached fp32 export, which is
+        only exported when missing.
+        """
+        self.model_name = model_name
+        self.input_names = input_names
+        self.quantize = quantize
+        self.revision = getattr(model.config, "_commit_hash", None) or ""
+        self.dir_cache = dir_cache if dir_cache else self.config.dir_model / "onnx"
+
+        file = self.file_onnx
+        if not file.is_file():
+            if not self.file_fp32.is_file():
+                self.export(model, file=self.file_fp32)
+            if quantize:
+                self.quantize_int8(src=self.file_fp32, dst=file)
+
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(str(file), providers=["CPUExecutionProvider"])
+
+    def get_file(self, mode: str) -> Path:
+        """Cached ONNX file of model name, weights revision and mode."""
+        name = self.model_name.replace("/", "--")
+        if self.revision:
+            name = f"{name}@{self.revision}"
+        return self.dir_cache / f"{name}.{mode}.onnx"
+
+    @property
+    def file_fp32(self) -> Path:
+        """Cached fp32 ONNX file."""
+        return self.get_file("fp32")
+
+    @property
+    def file_onnx(self) -> Path:
+        """Cached ONNX file used for inference."""
+        return self.get_file("int8" if self.quantize else "fp32")
+
+    def export(self, model: torch.nn.Module, file: Path) -> bool:
+        """Export torch model with dynamic batch and sequence axes.
+
+        Each input gets its own sequence axis, T5 `decoder_input_ids` has
+        another length than `input_ids`. Seq2seq logits get a dynamic decoder
+        axis, classifier logits keep their fixed label axis.
+        """
+        IO.dir_create(file.parent)
+        dummy = {
+            name: torch.ones((2, 3 if name.startswith("decoder_") else 8), dtype=torch.long)
+            for name in self.input_names
+        }
+        axes = {name: {0: "batch", 1: f"{name}_sequence"} for name in self.input_names}
+        axes["logits"] = {0: "batch"}
+        if any(name.startswith("decoder_") for name in self.input_names):
+            axes["logits"][1] = "logits_sequence"
+
+        # dynamic_axes belong to the TorchScript exporter, newer torch defaults to dynamo
+        options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+        model.eval()
+        with torch.inference_mode():
+            torch.onnx.export(
+                model,
+                args=(dummy,),
+                f=str(file),
+                input_names=list(self.input_names),
+                output_names=["logits"],
+                dynamic_axes=axes,
+                opset_version=14,
+                **options,
+            )
+        return file.is_file()
+
+    def quantize_int8(self, src: Path, dst: Path) -> bool:
+        """Apply dynamic int8 quantization on weights."""
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(src), str(dst), weight_type=QuantType.QInt8)
+        return dst.is_file()
+
+    def run(self, inputs: dict) -> np.ndarray:
+        """Run inference, return logits as numpy array."""
+        feed = {
+            name: np.asarray(inputs[name], dtype=np.int64)
+            for name in self.input_names
+        }
+        return self.session.run(["logits"], feed)[0]
+
+    def parity(self, model: torch.nn.Module, inputs: dict) -> float:
+        """Max absolute logits difference between torch model and ONNX session."""
+        feed = {name: torch.as_tensor(inputs[name]) for name in self.input_names}
+        with torch.inference_mode():
+            expected = model(**feed).logits.numpy()
+        return float(np.abs(expected - self.run(inputs)).max())
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """Softmax over last axis."""
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def get_model_id(model_name: str, model: torch.nn.Module, onnx: Optional[OnnxModel] = None) -> str:
+    """Model id with weights revision and backend, changes when outputs may change."""
+    revision = getattr(model.config, "_commit_hash", None) or ""
+    backend = "torch"
+    if onnx:
+        backend = "onnx-int8" if onnx.quantize else "onnx"
+    return f"{model_name}@{revision}:{backend}"
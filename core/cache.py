@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Content Addressed Inference Cache."""
+
+import inspect
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import orjson
+
+from ..base.chars import hash2b, hash2s
+from ..base.io import IO
+from ..config import Config
+
+
+__all__ = (
+    "InferenceCache",
+    "CachedDetector",
+)
+
+
+def normalize(text: str) -> str:
+    """Normalize text for cache key: NFC unicode and collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class InferenceCache:
+    """Two tier cache of inference results: in-memory LRU and SQLite on disk.
+
+    Keys are md5 of normalized text. The default disk file is named by the
+    full model id (name, weights revision, backend), so backends and revisions
+    of one model never share or drop each other's rows. Rows are also keyed by
+    model id, so a shared explicit file keeps results of each model apart.
+    """
+
+    config = Config()
+
+    def __init__(self, model_id: str, size: int = 100_000, file: Optional[Path] = None) -> None:
+        """Init, file=None for default file under Config.dir_cache."""
+        self.model_id = model_id
+        self.size = size
+
+        self.memory: OrderedDict[bytes, dict] = OrderedDict()
+        self.stats = {"memory": 0, "disk": 0, "miss": 0}
+        self.lock = threading.RLock()
+
+        self.file = file if file else self.get_file(model_id)
+        IO.dir_create(self.file.parent)
+        self.db = sqlite3.connect(str(self.file), timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")  # readers do not block writer processes
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results (model TEXT, key BLOB, value BLOB, PRIMARY KEY (model, key))"
+        )
+        self.db.commit()
+
+    @classmethod
+    def get_file(cls, model_id: str) -> Path:
+        """Default disk file of model id: model name, backend and hash of full id."""
+        name = model_id.split("@")[0].replace("/", "--")
+        backend = model_id.rsplit(":", 1)[-1] if ":" in model_id else "model"
+        return cls.config.dir_cache / f"{name}-{backend}-{hash2s(model_id)[:8]}.sqlite"
+
+    @staticmethod
+    def to_key(text: str) -> bytes:
+        """Cache key for text string."""
+        return hash2b(normalize(text))
+
+    def remember(self, key: bytes, value: dict) -> None:
+        """Put value into memory tier, drop least recently used."""
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.size:
+            self.memory.popitem(last=False)
+
+    def get_many(self, texts: list[str]) -> list[Optional[dict]]:
+        """Get cached values for list of text, None for miss."""
+        keys = [self.to_key(text) for text in texts]
+        values: list[Optional[dict]] = [None] * len(texts)
+        with self.lock:
+            missing: dict[bytes, list[int]] = {}
+            for i, key in enumerate(keys):
+                value = self.memory.get(key)
+                if value is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self.memory.move_to_end(key)
+                    values[i] = value
+                    self.stats["memory"] += 1
+
+            found: list[tuple[bytes, bytes]] = []
+            items = list(missing)
+            for start in range(0, len(items), 500):
+                chunk = items[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                found += self.db.execute(
+                    f"SELECT key, value FROM results WHERE model = ? AND key IN ({marks})",
+                    [self.model_id, *chunk],
+                ).fetchall()
+
+            for key, raw in found:
+                value = orjson.loads(raw)
+                self.remember(key, value)
+                for i in missing.pop(key):
+                    values[i] = value
+                    self.stats["disk"] += 1
+
+            self.stats["miss"] += sum(len(index) for index in missing.values())
+        return values
+
+    def set_many(self, texts: list[str], values: list[dict]) -> None:
+        """Put values for list of text into both tiers."""
+        rows = []
+        with self.lock:
+            for text, value in zip(texts, values):
+                key = self.to_key(text)
+                self.remember(key, value)
+                rows.append((self.model_id, key, orjson.dumps(value)))
+            self.db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", rows)
+            self.db.commit()
+
+    def get(self, text: str) -> Optional[dict]:
+        """Get cached value for text, None for miss."""
+        return self.get_many([text])[0]
+
+    def set(self, text: str, value: dict) -> None:
+        """Put value for text."""
+        self.set_many([text], [value])
+
+    @property
+    def hit_rate(self) -> float:
+        """Ratio of lookups answered from memory or disk."""
+        total = sum(self.stats.values())
+        return (self.stats["memory"] + self.stats["disk"]) / total if total else 0.0
+
+    def report(self) -> dict:
+        """Hit counts and hit rate."""
+        return dict(self.stats, model=self.model_id, hit_rate=round(self.hit_rate, 4))
+
+    def close(self) -> None:
+        """Close disk tier."""
+        self.db.close()
+
+
+class CachedDetector:
+    """Detector proxy answering `get`/`get_many` from InferenceCache.
+
+    Inputs are text strings, or tuples of strings for multi-argument `get`
+    like `AspectBasedSentimentAnalysis.get(sentence, aspect)`. Results are
+    dataclasses of `result_cls`. Other attributes delegate to the detector.
+    """
+
+    def __init__(
+            self,
+            detector: Any,
+            result_cls: type,
+            size: int = 100_000,
+            file: Optional[Path] = None) -> None:
+        """Init."""
+        self.detector = detector
+        self.result_cls = result_cls
+        self.cache = InferenceCache(model_id=detector.model_id, size=size, file=file)
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate to detector."""
+        return getattr(self.detector, name)
+
+    @staticmethod
+    def to_text(item: Union[str, tuple]) -> str:
+        """Join multi-argument input into one cache text."""
+        return item if isinstance(item, str) else "\x1f".join(item)
+
+    def compute(self, items: list) -> list:
+        """Run detector on cache misses, batched when detector supports it."""
+        if all(isinstance(item, str) for item in items) and hasattr(self.detector, "get_many"):
+            return self.detector.get_many(items)
+        if all(isinstance(item, tuple) for item in items) and hasattr(self.detector, "get_batch"):
+            return self.detector.get_batch(items)
+        return [
+            self.detector.get(item) if isinstance(item, str) else self.detector.get(*item)
+            for item in items
+        ]
+
+    def get_many(self, items: list) -> list:
+        """Get results for list of inputs, in input order."""
+        texts = [self.to_text(item) for item in items]
+        values = self.cache.get_many(texts)
+
+        # misses sharing a cache key run once, result is copied to each index
+        missing: dict[bytes, list[int]] = {}
+        for i, value in enumerate(values):
+            if value is None:
+                missing.setdefault(self.cache.to_key(texts[i]), []).append(i)
+        if missing:
+            first = [index[0] for index in missing.values()]
+            results = self.compute([items[i] for i in first])
+            results = [asdict(x) if is_dataclass(x) else x for x in results]
+            self.cache.set_many([texts[i] for i in first], results)
+            for index, result in zip(missing.values(), results):
+                for i in index:
+                    values[i] = result
+
+        return [self.result_cls(**value) for value in values]
+
+    def get(self, *args: str, **kwargs: str) -> Any:
+        """Get result for one input, same arguments as detector `get`.
+
+        Arguments are bound against the detector `get` signature, so keyword
+        order never changes the cache key or the argument positions.
+        """
+        values = list(inspect.signature(self.detector.get).bind(*args, **kwargs).arguments.values())
+        item = values[0] if len(values) == 1 else tuple(values)
+        return self.get_many([item])[0]
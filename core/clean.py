@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Fast Text Clean Up for Reddit Markdown."""
+
+# Same steps as `SemanticPatternFinder.clean_up`, without the markdown to
+# HTML to BeautifulSoup round trip:
+# - strip markdown syntax with precompiled regexes, keep the text
+# - drop raw html tags, unescape html entities
+# - demojize by lookup in table of emoji aliases
+# - replace strange quotes, fold to ascii, normalize whitespace
+#
+# Known differences are listed in tests/test_clean.py.
+
+import html
+import re
+import unicodedata
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import Iterable
+
+from emoji import EMOJI_DATA
+
+
+__all__ = (
+    "strip_markdown",
+    "demojize",
+    "clean_text",
+    "clean_texts",
+)
+
+
+try:
+    from unidecode import unidecode
+except ImportError:
+    def unidecode(text: str) -> str:
+        """Fold text into ascii, same fallback as cleantext."""
+        return unicodedata.normalize("NFD", text).encode("ascii", "ignore").decode()
+
+
+ESCAPED_CHARS = "\\`*_{}[]()>#+-.!"
+ESCAPE_REGEX = re.compile(r"\\([\\`*_{}\[\]()>#+\-.!])")
+RESTORE_REGEX = re.compile("[\ue000-\ue00f]")
+
+MARKDOWN_REGEXES = (
+    # block level, per line
+    (re.compile(r"^ {0,3}\[[^\]\n]+\]:[ \t]*\S.*$", re.M), ""),  # reference definition
+    (re.compile(r"^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$", re.M), ""),  # horizontal rule
+    (re.compile(r"^(.+)\n(?:=+|-+)[ \t]*$", re.M), r"\1"),  # setext header
+    (re.compile(r"^#{1,6}(.*?)#*[ \t]*$", re.M), r"\1"),  # atx header
+    (re.compile(r"^(?: {0,3}>[ \t]?)+", re.M), ""),  # blockquote
+    (re.compile(r"^[ \t]*(?:[-*+]|\d+\.)[ \t]+", re.M), ""),  # list item
+    # inline
+    (re.compile(r"(`+)[ \t]*(.+?)[ \t]*\1", re.S), r"\2"),  # code span
+    (re.compile(r"!\[[^\]]*\]\([^)]*\)"), ""),  # image, html text has no alt
+    (re.compile(r"\[([^\]]+)\](?:\([^)]*\)|\[[^\]]*\])"), r"\1"),  # link
+    (re.compile(r"<((?:https?|ftp)://[^>\s]+|mailto:[^>\s]+)>"), r"\1"),  # auto link
+    (re.compile(r"</?[A-Za-z][^<>]*>|<!--.*?-->", re.S), ""),  # html tag
+    (re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1"), r"\2"),  # strong
+    (re.compile(r"\*(?=\S)(.+?)(?<=\S)\*"), r"\1"),  # emphasis
+    (re.compile(r"(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)"), r"\1"),  # emphasis, not intraword
+)
+
+STRANGE_QUOTES = str.maketrans(
+    {char: '"' for char in "«‹»›„“‟”❝❞❮❯〝〞〟＂"}
+    | {char: "'" for char in "‘‛’❛❜`´"}
+)
+LINE_BREAK_REGEX = re.compile(r"(?:\r\n|[\n\v])+")
+SPACE_REGEX = re.compile(r"(?!\n)\s+")
+
+
+@lru_cache(maxsize=1)
+def get_emoji_table() -> tuple[dict[str, str], re.Pattern, int]:
+    """Get table of emoji to alias, regex of emoji character runs and longest emoji."""
+    table: dict[str, str] = {}
+    for char, data in EMOJI_DATA.items():
+        if "en" in data:
+            table[char] = data["alias"][0] if "alias" in data else data["en"]
+    chars = "".join(sorted({c for char in table for c in char if not c.isascii()}))
+    regex = re.compile("[" + re.escape(chars) + "]+|[#*0-9]\ufe0f?\u20e3")
+    return table, regex, max(len(char) for char in table)
+
+
+def demojize(text: str) -> str:
+    """Replace emoji with `:alias:` names, longest match first."""
+    table, regex, longest = get_emoji_table()
+
+    def replace(match: re.Match) -> str:
+        run = match.group()
+        out: list[str] = []
+        i = 0
+        while i < len(run):
+            for size in range(min(longest, len(run) - i), 0, -1):
+                name = table.get(run[i:i + size])
+                if name:
+                    out.append(name)
+                    i += size
+                    break
+            else:
+                out.append(run[i])
+                i += 1
+        return "".join(out)
+
+    return regex.sub(replace, text)
+
+
+def strip_markdown(text: str) -> str:
+    """Strip markdown syntax and html tags, keep text."""
+    text = ESCAPE_REGEX.sub(lambda m: chr(0xE000 + ESCAPED_CHARS.index(m.group(1))), text)
+    for regex, repl in MARKDOWN_REGEXES:
+        text = regex.sub(repl, text)
+    text = RESTORE_REGEX.sub(lambda m: ESCAPED_CHARS[ord(m.group()) - 0xE000], text)
+    return html.unescape(text)
+
+
+def clean_text(text: str) -> str:
+    """Clean up Reddit markdown text, fast version of `SemanticPatternFinder.clean_up`."""
+    text = demojize(strip_markdown(text))
+    text = unidecode(text.translate(STRANGE_QUOTES))
+    text = "\n".join(line.strip() for line in text.splitlines())
+    text = SPACE_REGEX.sub(" ", LINE_BREAK_REGEX.sub("\n", text))
+    return text.strip()
+
+
+def clean_texts(texts: Iterable[str], n_process: int = 1, chunksize: int = 256) -> list[str]:
+    """Clean up batch of texts, in a process pool when n_process > 1."""
+    if n_process <= 1:
+        return [clean_text(text) for text in texts]
+    with Pool(n_process) as pool:
+        return pool.map(clean_text, texts, chunksize=chunksize)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Corpus Collocation Scores of Skip-grams."""
+
+# Counts word pairs from SkipgramComponent(hashed=True) over a Doc stream into
+# a sorted pair table: pair id, left word id, right word id, count.
+# Each batch is merged into the table, no recount of earlier batches.
+# Scores come from the 2x2 contingency table of each pair, vectorized:
+# - c12: count of pair, c1: pairs with left word, c2: pairs with right word
+# - N: count of all pairs
+# - PMI: log2(c12 * N / (c1 * c2))
+# - LLR: Dunning log-likelihood ratio G2 = 2 * sum(k * log(k * N / (row * col)))
+# - t-score: (c12 - c1 * c2 / N) / sqrt(c12)
+
+from dataclasses import dataclass
+from typing import Iterable, Union
+
+import numpy as np
+from spacy.tokens import Doc, Span
+
+from .ngrams import HASH_PRIME, SkipgramComponent
+
+
+__all__ = (
+    "Collocation",
+    "CollocationCounter",
+)
+
+
+@dataclass
+class Collocation:
+    """Collocation of word pair with scores."""
+
+    words: str
+    count: int
+    pmi: float
+    llr: float
+    t_score: float
+
+
+def xlogy(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """x * log(y), zero where x is zero."""
+    return np.where(x > 0, x * np.log(np.where(x > 0, y, 1.0)), 0.0)
+
+
+class CollocationCounter:
+    """Exact skip-gram counts over a corpus, updated per batch, with association scores.
+
+    Docs or sentence Spans must carry hashed skip-grams: `spacy-skipgram`
+    with `hashed=True`, the same `gap`, at the level being counted.
+    """
+
+    def __init__(self, gap: int = 2, batch_size: int = 100_000, extension_name: str = "skipgram") -> None:
+        """Init, batch_size is number of words buffered before table update."""
+        self.gap = gap
+        self.batch_size = batch_size
+        self.extension_name = extension_name
+
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.left = np.zeros(0, dtype=np.uint64)
+        self.right = np.zeros(0, dtype=np.uint64)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+        self.strings = None
+        self.pending: list[np.ndarray] = []
+        self.pending_size = 0
+
+    @property
+    def total(self) -> int:
+        """Count of all pairs."""
+        self.flush()
+        return int(self.counts.sum())
+
+    def update(self, sequence: Union[Doc, Span]) -> None:
+        """Count skip-grams of Doc or Span."""
+        words = sequence._.get(f"{self.extension_name}_ids")
+        if words is False or words is None:
+            raise ValueError("no hashed skipgrams: add `spacy-skipgram` with `hashed=True`")
+        self.strings = sequence.doc.vocab.strings
+        self.pending.append(words)
+        self.pending_size += len(words)
+        if self.pending_size >= self.batch_size:
+            self.flush()
+
+    def update_many(self, sequences: Iterable[Union[Doc, Span]]) -> "CollocationCounter":
+        """Count skip-grams of a batch or stream of Doc or Span."""
+        for sequence in sequences:
+            self.update(sequence)
+        self.flush()
+        return self
+
+    def flush(self) -> None:
+        """Merge buffered pairs into the pair table."""
+        if not self.pending:
+            return
+        pairs = [self.get_pairs(words) for words in self.pending]
+        left = np.concatenate([self.left, *(x for x, _ in pairs)])
+        right = np.concatenate([self.right, *(x for _, x in pairs)])
+        counts = np.concatenate([self.counts, np.ones(len(left) - len(self.left), dtype=np.int64)])
+        keys, first, inverse = np.unique(left * HASH_PRIME + right, return_index=True, return_inverse=True)
+        self.keys = keys
+        self.left = left[first]
+        self.right = right[first]
+        self.counts = np.bincount(inverse, weights=counts, minlength=len(keys)).astype(np.int64)
+        self.pending = []
+        self.pending_size = 0
+
+    def get_pairs(self, words: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Left and right word ids of skip-grams in words."""
+        left, right = SkipgramComponent.skip_pairs(len(words), self.gap)
+        return words[left], words[right]
+
+    def get_scores(self) -> dict[str, np.ndarray]:
+        """Count, PMI, LLR and t-score of all pairs, aligned with pair table."""
+        self.flush()
+        c12 = self.counts.astype(np.float64)
+        n = c12.sum()
+        _, left = np.unique(self.left, return_inverse=True)
+        _, right = np.unique(self.right, return_inverse=True)
+        c1 = np.bincount(left, weights=c12)[left]
+        c2 = np.bincount(right, weights=c12)[right]
+        expected = c1 * c2 / n if n else c12
+
+        table = (c12, c1 - c12, c2 - c12, n - c1 - c2 + c12)
+        rows = (c1, c1, n - c1, n - c1)
+        cols = (c2, n - c2, c2, n - c2)
+        llr = 2 * sum(xlogy(k, k * n / np.maximum(row * col, 1.0)) for k, row, col in zip(table, rows, cols))
+        return {
+            "count": self.counts,
+            "pmi": np.log2(c12 / expected),
+            "llr": llr,
+            "t_score": (c12 - expected) / np.sqrt(c12),
+        }
+
+    def top(self, k: int = 100, by: str = "llr", min_count: int = 1) -> list[Collocation]:
+        """Top-k collocations by count, pmi, llr or t_score, pairs seen at least min_count times."""
+        scores = self.get_scores()
+        if by not in scores:
+            raise ValueError(f"unknown score: {by}")
+        index = np.flatnonzero(self.counts >= min_count)
+        index = index[np.argsort(-scores[by][index], kind="stable")[:k]]
+        return [
+            Collocation(
+                words=f"{self.strings[int(self.left[i])]}_{self.strings[int(self.right[i])]}",
+                count=int(self.counts[i]),
+                pmi=float(scores["pmi"][i]),
+                llr=float(scores["llr"][i]),
+                t_score=float(scores["t_score"][i]),
+            )
+            for i in index
+        ]
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Streaming Corpus n-gram Counter With Bounded Memory."""
+
+# Counts hashed n-gram ids from NgramComponent(hashed=True) over a Doc stream:
+# - Count-Min Sketch per order: approximate counts in fixed memory, never under count
+# - top-k candidates per order, re-ranked by sketch estimate after each batch
+# - strings are built only for ids entering the top-k
+# Counters with the same width, depth and seed merge by adding their sketches,
+# so shards counted in separate processes can be combined.
+
+import heapq
+from typing import Iterable, Optional, Union
+
+import numpy as np
+from spacy.tokens import Doc, Span
+
+
+__all__ = (
+    "CountMinSketch",
+    "NgramCounter",
+)
+
+
+class CountMinSketch:
+    """Count-Min Sketch over uint64 ids, multiply-shift hash per row."""
+
+    def __init__(self, width: int = 1 << 20, depth: int = 4, seed: int = 0) -> None:
+        """Init, width is rounded up to a power of two."""
+        self.bits = max(int(width - 1).bit_length(), 1)
+        self.width = 1 << self.bits
+        self.depth = depth
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.mults = rng.integers(1, 1 << 63, size=depth, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.table = np.zeros((depth, self.width), dtype=np.int64)
+
+    def index(self, ids: np.ndarray) -> np.ndarray:
+        """Column of ids in each row, shape (depth, len(ids))."""
+        return (ids[None, :] * self.mults[:, None]) >> np.uint64(64 - self.bits)
+
+    def add(self, ids: np.ndarray, counts: np.ndarray) -> None:
+        """Add counts of unique ids."""
+        for row, cols in zip(self.table, self.index(ids)):
+            np.add.at(row, cols.astype(np.intp), counts)
+
+    def query(self, ids: np.ndarray) -> np.ndarray:
+        """Estimated counts of ids."""
+        cols = self.index(ids).astype(np.intp)
+        return np.min(self.table[np.arange(self.depth)[:, None], cols], axis=0)
+
+    def merge(self, other: "CountMinSketch") -> None:
+        """Add counts of other sketch with same shape and seed."""
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError("sketches differ in width, depth or seed")
+        self.table += other.table
+
+
+class NgramCounter:
+    """Approximate n-gram frequencies over a corpus, top-k per order.
+
+    Docs or sentence Spans must carry hashed ngrams: `spacy-ngram` with
+    `hashed=True`, at the level (doc or sentence) being counted.
+    """
+
+    def __init__(
+            self,
+            ngrams: tuple[int, ...] = (2, 3),
+            top_k: int = 1000,
+            width: int = 1 << 20,
+            depth: int = 4,
+            seed: int = 0,
+            batch_size: int = 100_000,
+            extension_name: str = "ngram") -> None:
+        """Init, batch_size is number of ngram ids buffered before sketch update."""
+        self.ngrams = ngrams
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.extension_name = extension_name
+
+        self.sketches = {count: CountMinSketch(width, depth, seed) for count in ngrams}
+        self.top_ids = {count: np.zeros(0, dtype=np.uint64) for count in ngrams}
+        self.names: dict[int, dict[int, str]] = {count: {} for count in ngrams}
+        self.total = {count: 0 for count in ngrams}
+
+        self.strings = None
+        self.pending: list[tuple[np.ndarray, dict[int, np.ndarray]]] = []
+        self.pending_size = 0
+
+    def update(self, sequence: Union[Doc, Span]) -> None:
+        """Count hashed ngrams of Doc or Span."""
+        underscore = sequence._
+        words = underscore.get(f"{self.extension_name}_ids")
+        if words is False or words is None:
+            raise ValueError("no hashed ngrams: add `spacy-ngram` with `hashed=True`")
+        self.strings = sequence.doc.vocab.strings
+        ids = {count: underscore.get(f"{self.extension_name}_{count}") for count in self.ngrams}
+        self.pending.append((words, ids))
+        self.pending_size += len(words)
+        if self.pending_size >= self.batch_size:
+            self.flush()
+
+    def update_many(self, sequences: Iterable[Union[Doc, Span]]) -> "NgramCounter":
+        """Count hashed ngrams of stream of Doc or Span."""
+        for sequence in sequences:
+            self.update(sequence)
+        self.flush()
+        return self
+
+    def flush(self) -> None:
+        """Add buffered ids into sketches and re-rank top-k."""
+        if not self.pending:
+            return
+        for count in self.ngrams:
+            parts = [ids[count] for _, ids in self.pending]
+            ids = np.concatenate(parts)
+            if not len(ids):
+                continue
+            uniq, first, counts = np.unique(ids, return_index=True, return_counts=True)
+            self.sketches[count].add(uniq, counts)
+            self.total[count] += len(ids)
+
+            owner = np.repeat(np.arange(len(parts)), [len(part) for part in parts])
+            offset = np.concatenate([np.arange(len(part)) for part in parts])
+            new = ~np.isin(uniq, self.top_ids[count])
+            self.rank(count, np.concatenate([self.top_ids[count], uniq[new]]))
+
+            names = self.names[count]
+            new &= np.isin(uniq, self.top_ids[count])
+            for x, i in zip(uniq[new], first[new]):
+                words = self.pending[owner[i]][0][offset[i]:offset[i] + count]
+                names[int(x)] = "_".join(self.strings[int(w)] for w in words)
+        self.pending = []
+        self.pending_size = 0
+
+    def rank(self, count: int, candidates: np.ndarray) -> None:
+        """Keep top-k candidates by sketch estimate, drop names of others."""
+        estimates = self.sketches[count].query(candidates)
+        if len(candidates) > self.top_k:
+            keep = np.argpartition(-estimates, self.top_k - 1)[:self.top_k]
+            candidates = candidates[keep]
+        self.top_ids[count] = candidates
+        top = set(candidates.tolist())
+        self.names[count] = {x: name for x, name in self.names[count].items() if x in top}
+
+    def merge(self, other: "NgramCounter") -> "NgramCounter":
+        """Merge counts of other counter, e.g. from another process."""
+        self.flush()
+        other.flush()
+        if self.ngrams != other.ngrams:
+            raise ValueError("counters differ in ngram orders")
+        for count in self.ngrams:
+            self.sketches[count].merge(other.sketches[count])
+            self.total[count] += other.total[count]
+            self.names[count] = {**other.names[count], **self.names[count]}
+            self.rank(count, np.union1d(self.top_ids[count], other.top_ids[count]))
+        return self
+
+    def top(self, count: int, k: Optional[int] = None) -> list[tuple[str, int]]:
+        """Top-k ngram strings of order with estimated counts, most frequent first."""
+        self.flush()
+        ids = self.top_ids[count]
+        estimates = self.sketches[count].query(ids)
+        pairs = [(int(c), self.names[count][int(x)]) for x, c in zip(ids, estimates)]
+        return [(name, c) for c, name in heapq.nlargest(k or self.top_k, pairs)]
+
+    def export(self, k: Optional[int] = None) -> dict[int, list[tuple[str, int]]]:
+        """Top-k ngram strings with estimated counts per order."""
+        return {count: self.top(count, k) for count in self.ngrams}
+
+    def __getstate__(self) -> dict:
+        """Pickle without StringStore and buffer, for process pools."""
+        self.flush()
+        state = dict(self.__dict__)
+        state["strings"] = None
+        return state
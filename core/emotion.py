@@ -4,13 +4,18 @@
 """Text Emotion Detection."""
 
 from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Optional, Union
 
-from transformers import AutoTokenizer, AutoModelWithLMHead
-from transformers import pipeline
+import numpy as np
+import torch
+
+from .backend import BACKENDS, OnnxModel, get_model_id, softmax
+from .registry import REGISTRY
 
 
 __all__ = (
     "Emotion",
+    "EmotionScore",
     "EmotionDetectorT5",
     "EmotionDetectorRoberta",
 )
@@ -24,6 +29,34 @@ class Emotion:
     emoji: str
 
 
+@dataclass
+class EmotionScore:
+    """Emotion Score over T5 emotion labels."""
+
+    sadness: float
+    joy: float
+    love: float
+    anger: float
+    fear: float
+    surprise: float
+
+    @property
+    def tag(self) -> str:
+        """Emotion Tag with highest score."""
+        keys = ("sadness", "joy", "love", "anger", "fear", "surprise")
+        _tag, _score = "", 0
+        for key in keys:
+            value = getattr(self, key, 0)
+            if value > _score:
+                _tag = key
+                _score = value
+        return _tag
+
+    def to_emotion(self) -> Emotion:
+        """Convert into Emotion."""
+        return Emotion(tag=self.tag, emoji=get_emotion_emoji(self.tag))
+
+
 def get_emotion_emoji(tag: str) -> str:
     # Define the emojis corresponding to each sentiment
     emoji_mapping = {
@@ -67,21 +100,198 @@ class EmotionDetectorT5:
     # emotions = ["joy", "sad", "dis", "sup", "fea", "ang"]
     # emotions = ["sadness", "joy", "love", "anger", "fear", "surprise"]
 
-    def __init__(self) -> None:
-        """Init Sentiment Analysis."""
-        self.model_name = "mrm8488/t5-base-finetuned-emotion"
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModelWithLMHead.from_pretrained(self.model_name)
+    labels = ("sadness", "joy", "love", "anger", "fear", "surprise")
+
+    def __init__(
+            self,
+            temperature: float = 1.0,
+            backend: str = "torch",
+            quantize: bool = False,
+            model_name: str = "mrm8488/t5-base-finetuned-emotion") -> None:
+        """Init Sentiment Analysis.
+
+        `temperature` divides label logits in `score_many`, plain temperature
+        scaling: 1.0 leaves them unchanged, use `fit_temperature` to fit it
+        on labelled texts.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}: {backend}")
+
+        self.model_name = model_name
+        self.temperature = temperature
+        self.label_ids = self.get_label_ids()
+
+        self.onnx: Optional[OnnxModel] = None
+        if backend == "onnx":
+            self.onnx = OnnxModel(
+                model=self.model,
+                model_name=self.model_name,
+                input_names=("input_ids", "attention_mask", "decoder_input_ids"),
+                quantize=quantize,
+            )
+
+    @property
+    def tokenizer(self) -> Any:
+        """Shared tokenizer from model registry."""
+        return REGISTRY.get("tokenizer", self.model_name)
+
+    @property
+    def model(self) -> Any:
+        """Shared model from model registry."""
+        return REGISTRY.get("lm", self.model_name)
+
+    @property
+    def model_id(self) -> str:
+        """Model id and version for inference cache."""
+        return get_model_id(self.model_name, self.model, self.onnx)
+
+    def get_label_ids(self) -> list[int]:
+        """Get token id of each label, which decides the label at step one.
+
+        Raises ValueError unless each label is a single token with its own id.
+        """
+        tokenizer = self.tokenizer
+        label_ids = []
+        for label in self.labels:
+            ids = tokenizer.encode(label, add_special_tokens=False)
+            if len(ids) != 1:
+                raise ValueError(f"label is not a single token: {label} {ids}")
+            label_ids.append(ids[0])
+        if len(set(label_ids)) != len(label_ids):
+            raise ValueError(f"label token ids are not unique: {label_ids}")
+        return label_ids
 
     def get(self, text: str) -> Emotion:
         """Check emotion from text string."""
-        input_ids = self.tokenizer.encode(text + '</s>', return_tensors='pt')
+        if self.onnx:
+            return self.get_many([text])[0]
+        tokenizer = self.tokenizer
+        input_ids = tokenizer.encode(text + '</s>', return_tensors='pt')
         output = self.model.generate(input_ids=input_ids,
                max_length=2)
-        dec = [self.tokenizer.decode(ids) for ids in output]
-        emo = dec[0].replace("<pad>", "").strip()
+        dec = [tokenizer.decode(ids) for ids in output]
+        return self.to_emotion(dec[0])
+
+    def to_emotion(self, decoded: str) -> Emotion:
+        """Convert decoded model output into Emotion."""
+        emo = decoded.replace("<pad>", "").replace("</s>", "").strip()
         return Emotion(tag=emo, emoji=get_emotion_emoji(emo))
 
+    @staticmethod
+    def iter_buckets(tokenizer: Any, texts: list[str], batch_size: int) -> Iterator[tuple[list[int], dict]]:
+        """Yield (input index, padded inputs) for texts bucketed by token length."""
+        encoded = tokenizer([text + '</s>' for text in texts])["input_ids"]
+        order = sorted(range(len(texts)), key=lambda i: len(encoded[i]))
+        for start in range(0, len(order), batch_size):
+            index = order[start:start + batch_size]
+            inputs = tokenizer.pad(
+                {"input_ids": [encoded[i] for i in index]},
+                return_tensors="pt",
+            )
+            yield index, inputs
+
+    def step_logits(self, model: Any, inputs: dict) -> torch.Tensor:
+        """Get logits of the first decoder step for padded inputs."""
+        start_id = model.config.decoder_start_token_id
+        feed = {
+            "input_ids": inputs["input_ids"],
+            "attention_mask": inputs["attention_mask"],
+            "decoder_input_ids": torch.full((len(inputs["input_ids"]), 1), start_id, dtype=torch.long),
+        }
+        if self.onnx:
+            return torch.from_numpy(self.onnx.run(feed))[:, -1]
+        return model(**feed).logits[:, -1]
+
+    def get_many(self, texts: list[str], batch_size: int = 32) -> list[Emotion]:
+        """Get list of Emotion from list of text string, in input order.
+
+        Inputs are bucketed by token length and padded within each bucket,
+        with one `generate` call per bucket. The onnx backend takes the
+        greedy token of a single decoder step, same as `max_length=2`.
+        Model and tokenizer are fetched once for the whole call.
+        """
+        model, tokenizer = self.model, self.tokenizer
+        emotions: list[Optional[Emotion]] = [None] * len(texts)
+        with torch.inference_mode():
+            for index, inputs in self.iter_buckets(tokenizer, texts, batch_size=batch_size):
+                if self.onnx:
+                    output = self.step_logits(model, inputs).argmax(dim=-1, keepdim=True)
+                else:
+                    output = model.generate(
+                        input_ids=inputs["input_ids"],
+                        attention_mask=inputs["attention_mask"],
+                        max_length=2,
+                    )
+                dec = tokenizer.batch_decode(output)
+                for i, decoded in zip(index, dec):
+                    emotions[i] = self.to_emotion(decoded)
+        return emotions
+
+    def score(self, text: str) -> EmotionScore:
+        """Get EmotionScore from text string."""
+        return self.score_many([text])[0]
+
+    def score_many(self, texts: list[str], batch_size: int = 32) -> list[EmotionScore]:
+        """Get list of EmotionScore from list of text string, in input order.
+
+        Runs the encoder once plus a single decoder step per bucket, then
+        softmax over the label token logits only, scaled by temperature.
+        """
+        model, tokenizer = self.model, self.tokenizer
+        scores: list[Optional[EmotionScore]] = [None] * len(texts)
+        with torch.inference_mode():
+            for index, inputs in self.iter_buckets(tokenizer, texts, batch_size=batch_size):
+                logits = self.step_logits(model, inputs)[:, self.label_ids] / self.temperature
+                probs = logits.softmax(dim=-1).tolist()
+                for i, prob in zip(index, probs):
+                    scores[i] = EmotionScore(**dict(zip(self.labels, prob)))
+        return scores
+
+    def fit_temperature(self, texts: list[str], tags: list[str], batch_size: int = 32, max_iter: int = 50) -> float:
+        """Fit temperature on texts with known emotion tags, set and return it.
+
+        Minimises negative log likelihood of the tags over the label logits,
+        fitting log temperature with LBFGS.
+        """
+        unknown = set(tags) - set(self.labels)
+        if unknown:
+            raise ValueError(f"tags must be one of {self.labels}: {sorted(unknown)}")
+
+        model, tokenizer = self.model, self.tokenizer
+        logits, targets = [], []
+        with torch.inference_mode():
+            for index, inputs in self.iter_buckets(tokenizer, texts, batch_size=batch_size):
+                logits.append(self.step_logits(model, inputs)[:, self.label_ids])
+                targets.extend(self.labels.index(tags[i]) for i in index)
+        logits = torch.cat(logits).clone()
+        target = torch.tensor(targets)
+
+        log_temperature = torch.zeros(1, requires_grad=True)
+        optimizer = torch.optim.LBFGS([log_temperature], lr=0.1, max_iter=max_iter)
+
+        def closure() -> torch.Tensor:
+            optimizer.zero_grad()
+            loss = torch.nn.functional.cross_entropy(logits / log_temperature.exp(), target)
+            loss.backward()
+            return loss
+
+        optimizer.step(closure)
+        self.temperature = float(log_temperature.exp())
+        return self.temperature
+
+    def parity(self, texts: list[str]) -> float:
+        """Max absolute logits difference of onnx backend against torch."""
+        if not self.onnx:
+            raise ValueError("parity check requires backend='onnx'")
+        model = self.model
+        start_id = model.config.decoder_start_token_id
+        diff = 0.0
+        for _, inputs in self.iter_buckets(self.tokenizer, texts, batch_size=len(texts)):
+            inputs = dict(inputs)
+            inputs["decoder_input_ids"] = torch.full((len(inputs["input_ids"]), 1), start_id, dtype=torch.long)
+            diff = max(diff, self.onnx.parity(model, inputs))
+        return diff
+
 
 class EmotionDetectorRoberta:
     """Emotion Detector from Roberta."""
@@ -119,20 +329,40 @@ class EmotionDetectorRoberta:
     #     "neutral",
     # ]
 
-    def __init__(self) -> None:
+    def __init__(
+            self,
+            backend: str = "torch",
+            quantize: bool = False,
+            model_name: str = "SamLowe/roberta-base-go_emotions") -> None:
         """Init."""
-        self.model_name = "SamLowe/roberta-base-go_emotions"
-        self.nlp = pipeline("sentiment-analysis", framework="pt", model=self.model_name)
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}: {backend}")
 
-    def get(self, text: str) -> Emotion:
-        """Get Emotion from text str."""
-        try:
-            results = self.nlp(text)
-        except RuntimeError as err:
-            print(f"len(text) = {len(text)}")
-            print(f"text: {text}")
-            raise(err)
+        self.model_name = model_name
+
+        self.onnx: Optional[OnnxModel] = None
+        if backend == "onnx":
+            self.onnx = OnnxModel(
+                model=self.nlp.model,
+                model_name=self.model_name,
+                input_names=("input_ids", "attention_mask"),
+                quantize=quantize,
+            )
+
+    @property
+    def nlp(self) -> Any:
+        """Shared pipeline from model registry."""
+        return REGISTRY.get("pipeline", self.model_name, task="sentiment-analysis", framework="pt")
 
+    @property
+    def model_id(self) -> str:
+        """Model id and version for inference cache."""
+        return get_model_id(self.model_name, self.nlp.model, self.onnx)
+
+    def to_emotion(self, results: Union[dict, list[dict]]) -> Emotion:
+        """Convert pipeline output for one text into Emotion."""
+        if isinstance(results, dict):
+            results = [results]
         data = {result['label']: result['score'] for result in results}
         tag, score = "", 0
         for key, value in data.items():
@@ -142,4 +372,77 @@ class EmotionDetectorRoberta:
         return Emotion(
             tag=tag,
             emoji=get_emotion_emoji(tag=tag),
-        )
\ No newline at end of file
+        )
+
+    def get(self, text: str) -> Emotion:
+        """Get Emotion from text str."""
+        if self.onnx:
+            return self.get_many([text])[0]
+        try:
+            results = self.nlp(text, truncation=True)
+        except RuntimeError as err:
+            print(f"len(text) = {len(text)}")
+            print(f"text: {text}")
+            raise(err)
+
+        return self.to_emotion(results)
+
+    def get_many(self, texts: list[str], batch_size: int = 32) -> list[Emotion]:
+        """Get list of Emotion from list of text str, in input order.
+
+        Texts are sorted by length and fed to the pipeline in batches, so
+        padding inside each batch stays close to the longest member.
+        The pipeline is fetched once for the whole call.
+        """
+        nlp = self.nlp
+        emotions: list[Optional[Emotion]] = [None] * len(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            index = order[start:start + batch_size]
+            batch = [texts[i] for i in index]
+            if self.onnx:
+                outputs = self.run_onnx(nlp, batch)
+            else:
+                outputs = nlp(batch, batch_size=len(batch), truncation=True)
+            for i, output in zip(index, outputs):
+                emotions[i] = self.to_emotion(output)
+        return emotions
+
+    @staticmethod
+    def tokenize(nlp: Any, texts: list[str]) -> dict:
+        """Tokenize list of text into padded numpy inputs."""
+        return nlp.tokenizer(texts, padding=True, truncation=True, return_tensors="np")
+
+    def run_onnx(self, nlp: Any, texts: list[str]) -> list[dict]:
+        """Run onnx backend, return top label per text like the pipeline."""
+        logits = self.onnx.run(self.tokenize(nlp, texts))
+        config = nlp.model.config
+        if config.problem_type == "multi_label_classification":
+            scores = 1 / (1 + np.exp(-logits))
+        else:
+            scores = softmax(logits)
+        return [
+            {"label": config.id2label[int(row.argmax())], "score": float(row.max())}
+            for row in scores
+        ]
+
+    def parity(self, texts: list[str]) -> float:
+        """Max absolute logits difference of onnx backend against torch."""
+        if not self.onnx:
+            raise ValueError("parity check requires backend='onnx'")
+        nlp = self.nlp
+        return self.onnx.parity(nlp.model, self.tokenize(nlp, texts))
+
+    def iter_emotions(self, texts: Iterable[str], batch_size: int = 32, buffer: int = 8) -> Iterator[Emotion]:
+        """Yield Emotion for each text from iterable, in input order.
+
+        Up to `batch_size * buffer` texts are held at once for length sorting.
+        """
+        chunk: list[str] = []
+        for text in texts:
+            chunk.append(text)
+            if len(chunk) >= batch_size * buffer:
+                yield from self.get_many(chunk, batch_size=batch_size)
+                chunk = []
+        if chunk:
+            yield from self.get_many(chunk, batch_size=batch_size)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Lexicon Flags Component."""
+
+# Each lexicon is a word list, for lexicon `logic`:
+# - Token._.is_logic: token is in a lexicon entry
+# - Span._.has_logic, Doc._.has_logic: any token is in a lexicon entry
+# Single word entries are looked up in one dict, multiword entries run in
+# one Aho-Corasick automaton, both in the same pass over the tokens.
+# Matched token indices are kept in Doc._.lexicon_hits, flags are getters.
+# Several components merge their hits into the same dict, by lexicon name.
+
+from bisect import bisect_left
+from collections import deque
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from spacy.language import Language
+from spacy.tokens import Doc, Span, Token
+
+from ..base.io import IO
+
+
+__all__ = (
+    "load_lexicon",
+    "AhoCorasick",
+    "LexiconComponent",
+)
+
+
+def load_lexicon(file: Union[str, Path]) -> list[str]:
+    """Load lexicon from json list or text file, one entry per line, # for comment."""
+    file = Path(file)
+    if file.suffix == ".json":
+        return IO.load_list(file)
+    lines = (line.strip() for line in file.read_text(encoding="utf8").splitlines())
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton over token sequences."""
+
+    def __init__(self) -> None:
+        """Init with root state."""
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[list[tuple[str, int]]] = [[]]
+
+    def add(self, words: tuple[str, ...], label: str) -> None:
+        """Add entry of words with label."""
+        state = 0
+        for word in words:
+            nxt = self.goto[state].get(word)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][word] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = nxt
+        self.output[state].append((label, len(words)))
+
+    def build(self) -> None:
+        """Build failure links, breadth first."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fail = self.fail[state]
+                while fail and word not in self.goto[fail]:
+                    fail = self.fail[fail]
+                target = self.goto[fail].get(word, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def step(self, state: int, word: str) -> int:
+        """Next state after word."""
+        while state and word not in self.goto[state]:
+            state = self.fail[state]
+        return self.goto[state].get(word, 0)
+
+
+class LexiconComponent:
+    """Spacy pipeline for lexicon flags."""
+
+    def __init__(self, lexicons: dict[str, Iterable[str]], attr: str = "lemma") -> None:
+        """Init, lexicons maps name to entries, attr is `lemma` or `lower`."""
+        if attr not in ("lemma", "lower"):
+            raise ValueError(f"unknown token attr: {attr}")
+        self.attr = attr
+        self.names = tuple(lexicons)
+
+        self.words: dict[str, frozenset[str]] = {}
+        self.single: dict[str, tuple[str, ...]] = {}
+        self.automaton: Optional[AhoCorasick] = None
+        for name, entries in lexicons.items():
+            entries = [tuple(entry.lower().split()) for entry in entries]
+            self.words[name] = frozenset(entry[0] for entry in entries if len(entry) == 1)
+            for word in self.words[name]:
+                self.single[word] = self.single.get(word, ()) + (name,)
+            for entry in entries:
+                if len(entry) > 1:
+                    self.automaton = self.automaton or AhoCorasick()
+                    self.automaton.add(entry, name)
+        if self.automaton:
+            self.automaton.build()
+
+        if not Doc.has_extension("lexicon_hits"):
+            Doc.set_extension("lexicon_hits", default=None)
+        for name in self.names:
+            Token.set_extension(f"is_{name}", getter=self.token_getter(name), force=True)
+            Span.set_extension(f"has_{name}", getter=self.span_getter(name), force=True)
+            Doc.set_extension(f"has_{name}", getter=self.doc_getter(name), force=True)
+
+    @staticmethod
+    def token_getter(name: str):
+        """Getter of Token._.is_{name}."""
+        def getter(token: Token) -> bool:
+            hits = (token.doc._.lexicon_hits or {}).get(name, [])
+            index = bisect_left(hits, token.i)
+            return index < len(hits) and hits[index] == token.i
+        return getter
+
+    @staticmethod
+    def span_getter(name: str):
+        """Getter of Span._.has_{name}."""
+        def getter(span: Span) -> bool:
+            hits = (span.doc._.lexicon_hits or {}).get(name, [])
+            index = bisect_left(hits, span.start)
+            return index < len(hits) and hits[index] < span.end
+        return getter
+
+    @staticmethod
+    def doc_getter(name: str):
+        """Getter of Doc._.has_{name}."""
+        def getter(doc: Doc) -> bool:
+            return bool((doc._.lexicon_hits or {}).get(name))
+        return getter
+
+    def get_word(self, token: Token) -> str:
+        """Token string to look up in lexicons."""
+        if self.attr == "lemma":
+            return token.lemma_.lower()
+        return token.lower_
+
+    def match(self, words: Iterable[str]) -> dict[str, list[int]]:
+        """Sorted indices of words in each lexicon, in one pass."""
+        hits: dict[str, set[int]] = {name: set() for name in self.names}
+        single = self.single
+        automaton = self.automaton
+        state = 0
+        for i, word in enumerate(words):
+            for name in single.get(word, ()):
+                hits[name].add(i)
+            if automaton:
+                state = automaton.step(state, word)
+                for name, size in automaton.output[state]:
+                    hits[name].update(range(i - size + 1, i + 1))
+        return {name: sorted(index) for name, index in hits.items()}
+
+    def __call__(self, doc: Doc) -> Doc:
+        """Pipeline entrypoint, keep hits of other lexicon components"""
+        hits = dict(doc._.lexicon_hits or {})
+        hits.update(self.match(self.get_word(token) for token in doc))
+        doc._.lexicon_hits = hits
+        return doc
+
+
+@Language.factory(
+    'lexicon_flags',
+    default_config={
+        'lexicons': {},
+        'files': {},
+        'attr': 'lemma',
+    },
+)
+def create_lexicon_component(
+                            nlp: Language,
+                            name: str,
+                            lexicons: dict[str, list[str]],
+                            files: dict[str, str],
+                            attr: str) -> LexiconComponent:
+    lexicons = dict(lexicons)
+    for key, file in files.items():
+        lexicons[key] = load_lexicon(file)
+    if not lexicons:
+        raise ValueError('No lexicon specified: try `lexicons={"logic": ["why", "how"]}` or `files={...}`')
+    return LexiconComponent(lexicons, attr=attr)
@@ -9,50 +9,43 @@
 
 # Reference: https://github.com/kpwhri/spacy-ngram#usage
 
-from __future__ import annotations
-from collections import deque, defaultdict
+from dataclasses import dataclass
+from typing import Iterable, Optional, Union
 
+import numpy as np
+from scipy.sparse import csr_matrix
+from spacy.attrs import IS_DIGIT, IS_PUNCT, IS_STOP, LEMMA
 from spacy.language import Language
 from spacy.tokens import Doc, Span
 
 
-@Language.factory(
-    'spacy-ngram',
-    default_config={
-        'extension_name': 'ngram',
-        'ngrams': (1, 2),
-        'include_bos': False,
-        'include_eos': False,
-        'sentence_level': False,
-        'doc_level': True,
-    },
-)
-def create_ngram_component(
-                            nlp: Language,
-                            name: str,
-                            extension_name: str,
-                            ngrams: tuple[int, ...],
-                            include_bos: bool,
-                            include_eos: bool,
-                            sentence_level: bool,
-                            doc_level: bool) -> NgramComponent:
-    if not sentence_level and not doc_level:
-        raise ValueError(
-            'Ngram target must be specified at sentence or document-level in the config: `sentence_level=True`')
+# odd 64-bit multiplier of rolling hash, ids wrap around modulo 2**64
+HASH_PRIME = np.uint64(0x100000001B3)
 
-    if isinstance(ngrams, int):
-        ngrams = (ngrams,)
 
-    if ngrams is None or len(ngrams) == 0:
-        raise ValueError(
-            'No ngram levels specified: try updating config to include unigrams: `ngrams=(1,)'
-        )
+@dataclass
+class SparseNgrams:
+    """Document-term matrix of hashed ngrams.
 
-    return NgramComponent(nlp, extension_name, ngrams=ngrams, include_bos=include_bos, include_eos=include_eos, sentence_level=sentence_level, doc_level=doc_level)
+    vocab maps ngram id to column, or is the number of columns of the hashing trick.
+    """
+
+    matrix: csr_matrix
+    vocab: Union[dict[int, int], int]
+    idf: Optional[np.ndarray] = None
 
 
 class NgramComponent:
-    """Spacy pipeline for ngram extraction."""
+    """Spacy pipeline for ngram extraction.
+
+    With `hashed=True`, `ngram_N` holds a numpy uint64 array of n-gram ids
+    instead of a list of strings: a rolling hash over lowercased lemma ids.
+    `ngram_ids` holds the lemma ids, `to_strings` gives the strings on request.
+
+    Kept tokens and their lowercased lemma ids are computed once per Doc from
+    `doc.to_array`, then sliced for each sentence and shared by all orders.
+    `to_sparse` turns hashed ngrams of Docs into a CSR document-term matrix.
+    """
 
     def __init__(self,
                  nlp: Language,
@@ -61,13 +54,16 @@ class NgramComponent:
                  include_eos=False,
                  sentence_level=False,
                  doc_level=True,
-                 ngrams=None) -> None:
+                 ngrams=None,
+                 hashed=False) -> None:
 
         if isinstance(ngrams, int):
             ngrams = (ngrams,)
 
-        for count in ngrams:
-            ext = f'{extension_name}_{count}'
+        exts = [f'{extension_name}_{count}' for count in ngrams]
+        if hashed:
+            exts.append(f'{extension_name}_ids')
+        for ext in exts:
             if doc_level and not Doc.has_extension(ext):
                 Doc.set_extension(ext, default=False, force=True)
             if sentence_level and not Span.has_extension(ext):
@@ -80,35 +76,159 @@ class NgramComponent:
         self.sentence_level = sentence_level
         self.doc_level = doc_level
         self.ngrams = ngrams
+        self.hashed = hashed
+        # lemma id -> lowercased lemma id, lowercased lemma is stop word:
+        # sorted arrays for vectorized lookup, recent lemmas in dict until merged,
+        # starting with id 0 of the empty lemma
+        self.lemma_keys = np.zeros(1, dtype=np.uint64)
+        self.lemma_lower = np.zeros(1, dtype=np.uint64)
+        self.lemma_stop = np.zeros(1, dtype=bool)
+        self.lemma_new: dict[int, tuple[int, bool]] = {}
 
-    def add_sentence_ngrams(self, doc: Doc):
-        """Add sentence-level ngrams"""
-        for sent in doc.sents:
-            self.get_ngrams(sent)
-
-    def add_document_ngrams(self, doc: Doc):
-        """Add document-level ngrams"""
-        self.get_ngrams(doc)
-
-    def get_ngrams(self, sequence: Doc | Span):
-        """Get ngrams from Doc or Span by iterating through the words"""
-        curr_words = deque(maxlen=max(self.ngrams))  # TODO: backfill with BOS?
-        curr_ngrams = defaultdict(list)
-        for word in self.itertokens(sequence):
-            curr_words.append(word)
-            for count, ngram in self.ngramize(curr_words):
-                curr_ngrams[count].append(ngram)
-        for count in self.ngrams:
-            sequence._.set(f'{self.extension_name}_{count}', curr_ngrams[count])
+    def get_words(self, doc: Doc) -> tuple[np.ndarray, np.ndarray]:
+        """Keep mask and lowercased lemma ids of all tokens in Doc, vectorized"""
+        array = doc.to_array([IS_STOP, IS_PUNCT, IS_DIGIT, LEMMA])
+        lemmas = array[:, 3]
+        pos = np.searchsorted(self.lemma_keys, lemmas)
+        pos[pos == len(self.lemma_keys)] = 0
+        found = self.lemma_keys[pos] == lemmas
+        lower = self.lemma_lower[pos]
+        stop = self.lemma_stop[pos]
+        if not found.all():
+            missing = np.flatnonzero(~found)
+            for i, lemma in zip(missing, lemmas[missing].tolist()):
+                lower[i], stop[i] = self.get_lemma(doc, lemma)
+            if len(self.lemma_new) > len(self.lemma_keys) // 64 + 64:
+                self.merge_lemmas()
+        keep = ~(array[:, :3].any(axis=1) | stop)
+        return keep, lower
+
+    def get_lemma(self, doc: Doc, lemma: int) -> tuple[int, bool]:
+        """Lowercased lemma id and stop word flag of lemma id not yet merged"""
+        entry = self.lemma_new.get(lemma)
+        if entry is None:
+            word = doc.vocab.strings[lemma].lower()
+            entry = self.lemma_new[lemma] = (doc.vocab.strings.add(word), word in self.nlp.Defaults.stop_words)
+        return entry
+
+    def merge_lemmas(self):
+        """Merge recent lemmas into sorted lookup arrays"""
+        keys = np.fromiter(self.lemma_new, dtype=np.uint64, count=len(self.lemma_new))
+        values = list(self.lemma_new.values())
+        keys = np.concatenate([self.lemma_keys, keys])
+        order = np.argsort(keys, kind='stable')
+        self.lemma_keys = keys[order]
+        self.lemma_lower = np.concatenate([self.lemma_lower, np.array([x for x, _ in values], dtype=np.uint64)])[order]
+        self.lemma_stop = np.concatenate([self.lemma_stop, np.array([x for _, x in values], dtype=bool)])[order]
+        self.lemma_new = {}
+
+    def get_sequence_ids(self, sequence: Union[Doc, Span], keep: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        """Lowercased lemma ids of kept tokens in Doc or Span, with BOS and EOS"""
+        start, end = (sequence.start, sequence.end) if isinstance(sequence, Span) else (0, len(sequence))
+        words = ids[start:end][keep[start:end]]
+        if self.include_bos or self.include_eos:
+            strings = sequence.doc.vocab.strings
+            bos = [strings.add('<BOS>')] if self.include_bos else []
+            eos = [strings.add('<EOS>')] if self.include_eos else []
+            words = np.concatenate([np.array(bos, dtype=np.uint64), words, np.array(eos, dtype=np.uint64)])
+        return words
 
-    def ngramize(self, sequence: deque):
-        """Create relevant ngrams for a given sequence"""
+    def get_ngrams(self, sequence: Union[Doc, Span], ids: np.ndarray):
+        """Get ngram strings from Doc or Span given its word ids"""
+        strings = sequence.doc.vocab.strings
+        words = [strings[x] for x in ids.tolist()]
         for count in self.ngrams:
-            if len(sequence) >= count:
-                yield count, '_'.join(sequence[i] for i in range(-count, 0))
+            ngrams = ['_'.join(words[i:i + count]) for i in range(len(words) - count + 1)]
+            sequence._.set(f'{self.extension_name}_{count}', ngrams)
+
+    def get_hashed_ngrams(self, sequence: Union[Doc, Span], ids: np.ndarray):
+        """Get hashed ngram ids from Doc or Span given its word ids, strings are not built"""
+        sequence._.set(f'{self.extension_name}_ids', ids)
+        for count, hashes in self.rolling_hash(ids, self.ngrams).items():
+            sequence._.set(f'{self.extension_name}_{count}', hashes)
+
+    @staticmethod
+    def rolling_hash(ids: np.ndarray, ngrams: tuple[int, ...]) -> dict[int, np.ndarray]:
+        """Ids of all ngrams per order: h(w1..wn) = h(w1..wn-1) * HASH_PRIME + id(wn)"""
+        hashes = {}
+        curr = ids
+        for count in range(1, max(ngrams) + 1):
+            if count > 1:
+                curr = curr[:-1] * HASH_PRIME + ids[count - 1:]
+            if count in ngrams:
+                hashes[count] = curr
+        return hashes
+
+    def to_strings(self, sequence: Union[Doc, Span], count: int) -> list[str]:
+        """Materialize hashed ngrams of Doc or Span as strings, same as string mode"""
+        strings = sequence.doc.vocab.strings
+        words = [strings[int(x)] for x in sequence._.get(f'{self.extension_name}_ids')]
+        return ['_'.join(words[i:i + count]) for i in range(len(words) - count + 1)]
+
+    def get_doc_hashes(self, doc: Doc, ngrams: tuple[int, ...]) -> list[np.ndarray]:
+        """Hashed ngram ids of Doc per order, from extensions or computed without setting them"""
+        stored = self.hashed and self.doc_level and set(ngrams) <= set(self.ngrams)
+        hashes = [doc._.get(f'{self.extension_name}_{count}') if stored else None for count in ngrams]
+        if any(not isinstance(x, np.ndarray) for x in hashes):
+            ids = self.get_sequence_ids(doc, *self.get_words(doc))
+            rolled = self.rolling_hash(ids, ngrams)
+            hashes = [rolled[count] for count in ngrams]
+        return hashes
+
+    def to_sparse(self,
+                  docs: Iterable[Doc],
+                  vocab: Optional[Union[dict[int, int], int]] = None,
+                  ngrams: Optional[tuple[int, ...]] = None,
+                  tfidf: bool = False,
+                  idf: Optional[np.ndarray] = None) -> SparseNgrams:
+        """Document-term CSR matrix of hashed ngrams, one row per Doc.
+
+        vocab None: columns of all ngrams seen in docs, sorted by id
+        vocab dict: fixed ngram id to column, other ngrams are dropped
+        vocab int: hashing trick, column is ngram id modulo vocab
+        tfidf: counts times smooth idf, rows l2 normalized, idf from docs if not given
+        """
+        ngrams = ngrams or self.ngrams
+        rows = [np.concatenate(self.get_doc_hashes(doc, ngrams)) for doc in docs]
+        ids = np.concatenate(rows) if rows else np.zeros(0, dtype=np.uint64)
+        indptr = np.concatenate([[0], np.cumsum([len(row) for row in rows])])
+
+        if vocab is None:
+            keys, columns = np.unique(ids, return_inverse=True)
+            vocab = dict(zip(keys.tolist(), range(len(keys))))
+            size = len(keys)
+        elif isinstance(vocab, int):
+            columns = ids % np.uint64(vocab)
+            size = vocab
+        else:
+            if not vocab:
+                raise ValueError('Empty vocab: pass None to build it from docs')
+            keys = np.fromiter(vocab, dtype=np.uint64, count=len(vocab))
+            values = np.fromiter(vocab.values(), dtype=np.int64, count=len(vocab))
+            order = np.argsort(keys)
+            keys, values = keys[order], values[order]
+            pos = np.minimum(np.searchsorted(keys, ids), len(keys) - 1)
+            found = keys[pos] == ids
+            indptr = np.concatenate([[0], np.cumsum(found)])[indptr]
+            columns = values[pos][found]
+            size = int(values.max()) + 1
 
-    def itertokens(self, sequence: Doc | Span):
-        """Return next relevant lemma from the sequence"""
+        data = np.ones(len(columns), dtype=np.float64)
+        matrix = csr_matrix((data, columns.astype(np.int64), indptr), shape=(len(rows), size))
+        matrix.sum_duplicates()
+
+        if tfidf:
+            if idf is None:
+                df = np.bincount(matrix.indices, minlength=size)
+                idf = np.log((1 + len(rows)) / (1 + df)) + 1
+            matrix.data *= idf[matrix.indices]
+            norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+            norms[norms == 0] = 1.0
+            matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+        return SparseNgrams(matrix=matrix, vocab=vocab, idf=idf)
+
+    def itertokens(self, sequence: Union[Doc, Span]):
+        """Return next relevant lemma from the sequence, token by token as reference of `get_words`"""
         if self.include_bos:
             yield '<BOS>'
         for token in sequence:
@@ -123,9 +243,132 @@ class NgramComponent:
 
     def __call__(self, doc: Doc):
         """Pipeline entrypoint"""
+        keep, ids = self.get_words(doc)
+        add_ngrams = self.get_hashed_ngrams if self.hashed else self.get_ngrams
         if self.sentence_level:
-            self.add_sentence_ngrams(doc)
+            for sent in doc.sents:
+                add_ngrams(sent, self.get_sequence_ids(sent, keep, ids))
         if self.doc_level:
-            self.add_document_ngrams(doc)
+            add_ngrams(doc, self.get_sequence_ids(doc, keep, ids))
         return doc
 
+
+class SkipgramComponent(NgramComponent):
+    """Spacy pipeline for skip-gram extraction.
+
+    `skipgram_2` holds word pairs at most `gap` words apart, `gap=0` gives
+    bigrams. With `hashed=True` pair ids are bigram ids: h(w1) * HASH_PRIME + h(w2).
+    """
+
+    def __init__(self,
+                 nlp: Language,
+                 extension_name: str,
+                 gap=2,
+                 include_bos=False,
+                 include_eos=False,
+                 sentence_level=False,
+                 doc_level=True,
+                 hashed=False) -> None:
+        super().__init__(nlp, extension_name, include_bos=include_bos, include_eos=include_eos,
+                         sentence_level=sentence_level, doc_level=doc_level, ngrams=(2,), hashed=hashed)
+        self.gap = gap
+
+    @staticmethod
+    def skip_pairs(size: int, gap: int) -> tuple[np.ndarray, np.ndarray]:
+        """Left and right word positions of all pairs at most gap words apart, by left then right"""
+        left = np.concatenate([np.arange(max(size - d, 0)) for d in range(1, gap + 2)])
+        right = left + np.repeat(np.arange(1, gap + 2), [max(size - d, 0) for d in range(1, gap + 2)])
+        order = np.lexsort((right, left))
+        return left[order], right[order]
+
+    def get_ngrams(self, sequence: Union[Doc, Span], ids: np.ndarray):
+        """Get skip-gram strings from Doc or Span given its word ids"""
+        strings = sequence.doc.vocab.strings
+        words = [strings[x] for x in ids.tolist()]
+        left, right = self.skip_pairs(len(words), self.gap)
+        skipgrams = [f'{words[i]}_{words[j]}' for i, j in zip(left.tolist(), right.tolist())]
+        sequence._.set(f'{self.extension_name}_2', skipgrams)
+
+    def get_doc_hashes(self, doc: Doc, ngrams: tuple[int, ...]) -> list[np.ndarray]:
+        """Hashed skip-gram ids of Doc, from extension or computed without setting it"""
+        hashes = doc._.get(f'{self.extension_name}_2') if self.hashed and self.doc_level else None
+        if not isinstance(hashes, np.ndarray):
+            ids = self.get_sequence_ids(doc, *self.get_words(doc))
+            left, right = self.skip_pairs(len(ids), self.gap)
+            hashes = ids[left] * HASH_PRIME + ids[right]
+        return [hashes]
+
+    def get_hashed_ngrams(self, sequence: Union[Doc, Span], ids: np.ndarray):
+        """Get hashed skip-gram ids from Doc or Span given its word ids"""
+        left, right = self.skip_pairs(len(ids), self.gap)
+        sequence._.set(f'{self.extension_name}_ids', ids)
+        sequence._.set(f'{self.extension_name}_2', ids[left] * HASH_PRIME + ids[right])
+
+
+@Language.factory(
+    'spacy-ngram',
+    default_config={
+        'extension_name': 'ngram',
+        'ngrams': (1, 2),
+        'include_bos': False,
+        'include_eos': False,
+        'sentence_level': False,
+        'doc_level': True,
+        'hashed': False,
+    },
+)
+def create_ngram_component(
+                            nlp: Language,
+                            name: str,
+                            extension_name: str,
+                            ngrams: tuple[int, ...],
+                            include_bos: bool,
+                            include_eos: bool,
+                            sentence_level: bool,
+                            doc_level: bool,
+                            hashed: bool) -> 'NgramComponent':
+    if not sentence_level and not doc_level:
+        raise ValueError(
+            'Ngram target must be specified at sentence or document-level in the config: `sentence_level=True`')
+
+    if isinstance(ngrams, int):
+        ngrams = (ngrams,)
+
+    if ngrams is None or len(ngrams) == 0:
+        raise ValueError(
+            'No ngram levels specified: try updating config to include unigrams: `ngrams=(1,)'
+        )
+
+    return NgramComponent(nlp, extension_name, ngrams=ngrams, include_bos=include_bos, include_eos=include_eos, sentence_level=sentence_level, doc_level=doc_level, hashed=hashed)
+
+
+@Language.factory(
+    'spacy-skipgram',
+    default_config={
+        'extension_name': 'skipgram',
+        'gap': 2,
+        'include_bos': False,
+        'include_eos': False,
+        'sentence_level': False,
+        'doc_level': True,
+        'hashed': False,
+    },
+)
+def create_skipgram_component(
+                            nlp: Language,
+                            name: str,
+                            extension_name: str,
+                            gap: int,
+                            include_bos: bool,
+                            include_eos: bool,
+                            sentence_level: bool,
+                            doc_level: bool,
+                            hashed: bool) -> 'SkipgramComponent':
+    if not sentence_level and not doc_level:
+        raise ValueError(
+            'Skipgram target must be specified at sentence or document-level in the config: `sentence_level=True`')
+
+    if gap < 0:
+        raise ValueError(f'Skipgram gap must be zero or more: {gap}')
+
+    return SkipgramComponent(nlp, extension_name, gap=gap, include_bos=include_bos, include_eos=include_eos, sentence_level=sentence_level, doc_level=doc_level, hashed=hashed)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Parse Cache of spaCy Docs in DocBin Shards."""
+
+import secrets
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+from spacy.language import Language
+from spacy.tokens import Doc, DocBin
+
+from ..base.chars import hash2b, hash2s
+from ..base.io import IO
+from ..config import Config
+
+
+__all__ = ("ParseCache",)
+
+
+class ParseCache:
+    """Opt-in cache of parsed Docs, keyed by text hash and pipeline fingerprint.
+
+    Docs are saved in DocBin shards under Config.dir_cache/docbin/<fingerprint>,
+    each with a keys file listing md5 of its texts. A pipeline with another
+    model name, version or pipe names gets another fingerprint. Custom
+    extension attributes are only kept with `store_user_data=True`.
+
+    Keep one cache for a whole run: parsed Docs are held until `shard_size`
+    of them make a shard, call `close()` to save the last partial shard.
+    Shard names carry a random suffix, so worker processes sharing the cache
+    directory never overwrite each other's shards. Threads may share one
+    cache: pending Docs, their keys, the index and stats change under a lock.
+    """
+
+    config = Config()
+
+    def __init__(
+            self,
+            nlp: Language,
+            dir_cache: Optional[Path] = None,
+            shard_size: int = 10_000,
+            store_user_data: bool = False) -> None:
+        """Init, load keys of existing shards."""
+        self.nlp = nlp
+        self.shard_size = shard_size
+        self.store_user_data = store_user_data
+
+        dir_cache = dir_cache if dir_cache else self.config.dir_cache / "docbin"
+        self.dir_cache = dir_cache / self.fingerprint
+        IO.dir_create(self.dir_cache)
+
+        self.index: dict[str, tuple[str, int]] = {}
+        self.shards = 0
+        for file in sorted(self.dir_cache.glob("shard-*.keys")):
+            for i, key in enumerate(IO.load_list(file)):
+                self.index[key] = (file.stem, i)
+            self.shards += 1
+
+        self.loaded: OrderedDict[str, list[Doc]] = OrderedDict()
+        self.pending = DocBin(store_user_data=store_user_data)
+        self.pending_docs: dict[str, Doc] = {}
+        self.stats = {"hit": 0, "miss": 0}
+        self.lock = threading.RLock()
+
+    @property
+    def fingerprint(self) -> str:
+        """Pipeline fingerprint of model name, version and pipe names."""
+        meta = self.nlp.meta
+        text = f"{meta.get('lang')}_{meta.get('name')}@{meta.get('version')}|{','.join(self.nlp.pipe_names)}"
+        return hash2s(text)
+
+    @staticmethod
+    def to_key(text: str) -> str:
+        """Cache key of text."""
+        return hash2b(text).hex()
+
+    def load_shard(self, shard: str) -> list[Doc]:
+        """Load Docs of shard, keep last two shards in memory."""
+        docs = self.loaded.get(shard)
+        if docs is None:
+            doc_bin = DocBin().from_disk(self.dir_cache / f"{shard}.spacy")
+            docs = list(doc_bin.get_docs(self.nlp.vocab))
+            self.loaded[shard] = docs
+            while len(self.loaded) > 2:
+                self.loaded.popitem(last=False)
+        self.loaded.move_to_end(shard)
+        return docs
+
+    def flush(self) -> None:
+        """Save pending Docs as new shard."""
+        with self.lock:
+            if not self.pending_docs:
+                return
+            shard = f"shard-{self.shards:05d}-{secrets.token_hex(4)}"
+            keys = list(self.pending_docs)
+            self.pending.to_disk(self.dir_cache / f"{shard}.spacy")
+            IO.save_list(self.dir_cache / f"{shard}.keys", keys)  # keys last, shard is complete once listed
+            for i, key in enumerate(keys):
+                self.index[key] = (shard, i)
+            self.shards += 1
+            self.pending = DocBin(store_user_data=self.store_user_data)
+            self.pending_docs = {}
+
+    def close(self) -> None:
+        """Save last partial shard."""
+        self.flush()
+
+    def add(self, key: str, doc: Doc) -> None:
+        """Add parsed Doc into pending shard, once per key."""
+        with self.lock:
+            if key in self.index or key in self.pending_docs:
+                return
+            self.pending.add(doc)
+            self.pending_docs[key] = doc
+            if len(self.pending_docs) >= self.shard_size:
+                self.flush()
+
+    def lookup(self, key: str) -> Optional[Doc]:
+        """Cached Doc of key from pending or saved shards, None for miss."""
+        with self.lock:
+            doc = self.pending_docs.get(key)
+            if doc is None and key in self.index:
+                shard, i = self.index[key]
+                doc = self.load_shard(shard)[i]
+            return doc
+
+    def pipe(
+            self,
+            texts: Iterable[Any],
+            as_tuples: bool = False,
+            batch_size: int = 64,
+            n_process: int = 1) -> Iterator[Any]:
+        """Same as `nlp.pipe`, cached Docs are loaded instead of parsed.
+
+        Misses of the whole stream go through one `nlp.pipe`, a text repeated
+        before its parse is saved is parsed once.
+        """
+        queue: deque[tuple[str, bool, Any]] = deque()  # key, is miss, context
+        parsing: set[str] = set()
+
+        def iter_misses() -> Iterator[str]:
+            for item in texts:
+                text, context = item if as_tuples else (item, None)
+                key = self.to_key(text)
+                with self.lock:
+                    miss = key not in parsing and key not in self.pending_docs and key not in self.index
+                    self.stats["miss" if miss else "hit"] += 1
+                queue.append((key, miss, context))
+                if miss:
+                    parsing.add(key)
+                    yield text
+
+        def drain(parsed: Optional[Doc]) -> Iterator[Any]:
+            while queue:
+                key, miss, context = queue[0]
+                if miss:
+                    if parsed is None:
+                        return
+                    self.add(key, parsed)
+                    parsing.discard(key)
+                    doc, parsed = parsed, None
+                else:
+                    doc = self.lookup(key)
+                    if doc is None:  # repeat of a miss still in nlp.pipe
+                        return
+                queue.popleft()
+                yield (doc, context) if as_tuples else doc
+
+        for parsed in self.nlp.pipe(iter_misses(), batch_size=batch_size, n_process=n_process):
+            yield from drain(parsed)
+        yield from drain(None)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Lexicon Polarity and Subjectivity, same scores as TextBlob."""
+
+# TextBlob(text).polarity runs the pattern analyzer over the text, and
+# .subjectivity runs it again. PatternSentiment loads the pattern lexicon
+# once into a flat dict and scores both in one pass over the tokens:
+# - text: tokens from the pattern tokenizer, same scores as TextBlob
+# - Doc or Span: tokens from spacy, no tokenization, close to TextBlob
+#   where spacy splits tokens the same way
+#
+# EMOTICONS is vendored from pattern (textblob._text, private to textblob),
+# so scores do not depend on a private module across textblob versions.
+
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import Iterable, Union
+
+from spacy.tokens import Doc, Span
+from textblob.en import sentiment as pattern_sentiment
+
+
+__all__ = (
+    "load_pattern_lexicon",
+    "score_words",
+    "PatternSentiment",
+)
+
+
+NEGATIONS = frozenset(pattern_sentiment.negations)
+
+# emoticon group: (polarity, marks), groups in pattern order
+EMOTICONS: dict[str, tuple[float, tuple[str, ...]]] = {
+    "love": (1.0, ("<3", "♥")),
+    "grin": (1.0, ("8-D", ":-D", ":D", "=-D", "=D", ">:D", "X-D", "XD", "x-D", "xD")),
+    "taunt": (0.75, (":-P", ":-b", ":-p", ":P", ":^)", ":b", ":c)", ":o)", ":p", ">:P")),
+    "smile": (0.5, ("8)", "8-)", ":)", ":-)", ":3", ":>", ":]", ":}", "=)", "=]", ">:)")),
+    "wink": (0.25, ("*)", "*-)", ";)", ";-)", ";-]", ";D", ";]", ";^)", ">;]")),
+    "gasp": (0.05, (":-O", ":-o", ":O", ":o", ">:o", "o.O", "o_O", "°O°", "°o°")),
+    "worry": (-0.25, (":-.", ":-/", ":-S", ":-s", ":/", ":S", ":\\", ":s", ">.>", ">:/", ">:\\")),
+    "frown": (-0.75, (":(", ":-(", ":-<", ":-[", ":-c", ":[", ":c", ":{", "=(", "=/", ">:[")),
+    "cry": (-1.0, (":'''(", ":'(", ";'(")),
+}
+
+
+@lru_cache(maxsize=1)
+def load_pattern_lexicon() -> dict[str, tuple[float, float, float, bool]]:
+    """Load pattern lexicon: word to (polarity, subjectivity, intensity, is adverb)."""
+    len(pattern_sentiment)  # lazy load of en-sentiment.xml
+    return {
+        word: (*pos[None], any(tag in pos for tag in pattern_sentiment.modifiers))
+        for word, pos in dict.items(pattern_sentiment)
+    }
+
+
+@lru_cache(maxsize=1)
+def load_emoticons() -> dict[str, float]:
+    """Load lowercase emoticon to polarity, first group wins as in pattern."""
+    emoticons: dict[str, float] = {}
+    for polarity, marks in EMOTICONS.values():
+        for mark in marks:
+            emoticons.setdefault(mark.lower(), polarity)
+    return emoticons
+
+
+def score_words(words: Iterable[str]) -> tuple[float, float]:
+    """Get (polarity, subjectivity) of lowercase words, same rules as pattern assessments."""
+    lexicon = load_pattern_lexicon()
+    emoticons = load_emoticons()
+
+    found: list[list] = []  # [polarity, subjectivity, intensity, negated]
+    modifier = ""
+    negation = ""
+    for word in words:
+        entry = lexicon.get(word)
+        if entry:
+            polarity, subjectivity, intensity, is_adverb = entry
+            if not modifier:
+                found.append([polarity, subjectivity, intensity, False])
+            else:
+                last = found[-1]
+                last[0] = max(-1.0, min(polarity * last[2], +1.0))
+                last[1] = max(-1.0, min(subjectivity * last[2], +1.0))
+                last[2] = intensity
+            if negation:
+                found[-1][2] = 1.0 / found[-1][2]
+                found[-1][3] = True
+            modifier = word if is_adverb else ""
+            negation = word if word in NEGATIONS else ""
+        else:
+            if word in NEGATIONS:
+                negation = word
+            elif negation and len(word.strip("'")) > 1:
+                negation = ""
+            if negation and modifier and modifier.endswith("ly"):
+                found[-1][3] = True
+                negation = ""
+            elif modifier and len(word) > 2:
+                modifier = ""
+            if word == "!" and found:
+                found[-1][0] = max(-1.0, min(found[-1][0] * 1.25, +1.0))
+            if word == "(!)":
+                found.append([0.0, 1.0, 1.0, False])
+            if not word.isalpha() and len(word) <= 5 and word in emoticons:
+                found.append([emoticons[word], 1.0, 1.0, False])
+
+    polarity, subjectivity = 0, 0
+    for item in found:
+        polarity += item[0] * -0.5 if item[3] else item[0]
+        subjectivity += item[1]
+    size = float(len(found) or 1)
+    return polarity / size, subjectivity / size
+
+
+def score_text(text: str) -> tuple[float, float]:
+    """Get (polarity, subjectivity) of text, tokenized by pattern tokenizer."""
+    return score_words(w.lower() for w in " ".join(pattern_sentiment.tokenizer(text)).split())
+
+
+class PatternSentiment:
+    """Pattern lexicon scorer, TextBlob polarity and subjectivity without TextBlob."""
+
+    @staticmethod
+    def score(text: str) -> tuple[float, float]:
+        """Get (polarity, subjectivity) of text."""
+        return score_text(text)
+
+    @staticmethod
+    def score_doc(doc: Union[Doc, Span]) -> tuple[float, float]:
+        """Get (polarity, subjectivity) of Doc or Span, reuse spacy tokens."""
+        return score_words(token.lower_ for token in doc)
+
+    @staticmethod
+    def score_many(texts: list[str], n_process: int = 1, chunksize: int = 256) -> list[tuple[float, float]]:
+        """Get (polarity, subjectivity) of texts, in a process pool when n_process > 1."""
+        if n_process <= 1:
+            return [score_text(text) for text in texts]
+        with Pool(n_process) as pool:
+            return pool.map(score_text, texts, chunksize=chunksize)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Process-wide Model Registry."""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+__all__ = (
+    "ModelEntry",
+    "ModelRegistry",
+    "REGISTRY",
+)
+
+
+def load_spacy(name: str, pipes: tuple[str, ...] = (), **options: Any) -> Any:
+    """Load spacy model and add custom pipes by factory name."""
+    import spacy
+
+    nlp = spacy.load(name, **options)
+    for pipe in pipes:
+        nlp.add_pipe(pipe)
+    return nlp
+
+
+def load_tokenizer(name: str, **options: Any) -> Any:
+    """Load huggingface tokenizer."""
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(name, **options)
+
+
+def load_lm(name: str, **options: Any) -> Any:
+    """Load huggingface model with language modeling head."""
+    from transformers import AutoModelWithLMHead
+
+    return AutoModelWithLMHead.from_pretrained(name, **options).requires_grad_(False)
+
+
+def load_classifier(name: str, **options: Any) -> Any:
+    """Load huggingface sequence classification model."""
+    from transformers import AutoModelForSequenceClassification
+
+    return AutoModelForSequenceClassification.from_pretrained(name, **options).requires_grad_(False)
+
+
+def load_pipeline(name: str, task: str, **options: Any) -> Any:
+    """Load huggingface pipeline."""
+    from transformers import pipeline
+
+    nlp = pipeline(task, model=name, **options)
+    nlp.model.requires_grad_(False)
+    return nlp
+
+
+def get_size(model: Any) -> int:
+    """Estimate resident size in bytes of loaded model."""
+    if hasattr(model, "parameters") and hasattr(model, "buffers"):
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(x.numel() * x.element_size() for x in tensors)
+    if hasattr(model, "model") and hasattr(model, "tokenizer"):
+        return get_size(model.model)
+    if hasattr(model, "to_bytes") and hasattr(model, "pipe_names"):
+        return len(model.to_bytes())
+    return sys.getsizeof(model)
+
+
+@dataclass
+class ModelEntry:
+    """Loaded Model Entry."""
+
+    kind: str
+    name: str
+    options: tuple
+
+    model: Any
+
+    load_time: float  # seconds spent loading
+    size: int  # resident size in bytes
+    last_used: float  # time.monotonic() of last get
+
+
+class ModelRegistry:
+    """Registry handing out shared read-only models, loaded on first use.
+
+    Models are keyed by kind, name and options. When `budget` (bytes) is
+    set, least recently used models are evicted until total size fits.
+    """
+
+    loaders: dict[str, Callable[..., Any]] = {
+        "spacy": load_spacy,
+        "tokenizer": load_tokenizer,
+        "lm": load_lm,
+        "classifier": load_classifier,
+        "pipeline": load_pipeline,
+    }
+
+    def __init__(self, budget: int = 0) -> None:
+        """Init, budget=0 for unlimited memory."""
+        self.budget = budget
+        self.entries: OrderedDict[tuple, ModelEntry] = OrderedDict()
+        self.loading: dict[tuple, threading.Lock] = {}  # per key lock while loading
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def to_key(kind: str, name: str, options: dict) -> tuple:
+        """Hashable key for kind, name and options."""
+        items = tuple(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in sorted(options.items())
+        )
+        return (kind, name, items)
+
+    def get(self, kind: str, name: str, **options: Any) -> Any:
+        """Get shared model, load it if not loaded yet.
+
+        Loading holds only a lock of its key, other models stay available
+        meanwhile and a model is loaded once by concurrent callers.
+        """
+        if kind not in self.loaders:
+            raise ValueError(f"unknown model kind: {kind}")
+
+        key = self.to_key(kind, name, options)
+        model = self.lookup(key)
+        if model is not None:
+            return model
+
+        with self.lock:
+            key_lock = self.loading.setdefault(key, threading.Lock())
+        with key_lock:
+            model = self.lookup(key)
+            if model is not None:
+                return model
+
+            start_time = time.perf_counter()
+            model = self.loaders[kind](name, **options)
+            entry = ModelEntry(
+                kind=kind,
+                name=name,
+                options=key[2],
+                model=model,
+                load_time=time.perf_counter() - start_time,
+                size=get_size(model),
+                last_used=time.monotonic(),
+            )
+            with self.lock:
+                self.entries[key] = entry
+                self.loading.pop(key, None)
+                self.evict()
+            return model
+
+    def lookup(self, key: tuple) -> Any:
+        """Get loaded model of key and mark it used, None if not loaded."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            entry.last_used = time.monotonic()
+            return entry.model
+
+    @property
+    def size(self) -> int:
+        """Total resident size in bytes of loaded models."""
+        return sum(entry.size for entry in self.entries.values())
+
+    def evict(self) -> list[ModelEntry]:
+        """Evict least recently used models until within budget."""
+        evicted: list[ModelEntry] = []
+        with self.lock:
+            while self.budget and self.size > self.budget and len(self.entries) > 1:
+                _, entry = self.entries.popitem(last=False)
+                evicted.append(entry)
+        return evicted
+
+    def evict_idle(self, seconds: float) -> list[ModelEntry]:
+        """Evict models not used in the last number of seconds."""
+        now = time.monotonic()
+        with self.lock:
+            keys = [key for key, entry in self.entries.items() if now - entry.last_used > seconds]
+            return [self.entries.pop(key) for key in keys]
+
+    def clear(self) -> None:
+        """Drop all loaded models."""
+        with self.lock:
+            self.entries.clear()
+
+    def report(self) -> list[dict]:
+        """Load time and resident size per loaded model, most recent last."""
+        with self.lock:
+            return [
+                {
+                    "kind": entry.kind,
+                    "name": entry.name,
+                    "options": dict(entry.options),
+                    "load_time": round(entry.load_time, 4),
+                    "size": entry.size,
+                }
+                for entry in self.entries.values()
+            ]
+
+
+REGISTRY = ModelRegistry()
@@ -14,15 +14,19 @@
 # - [bad] https://github.com/ScalaConsultants/Aspect-Based-Sentiment-Analysis
 
 from dataclasses import dataclass
-from typing import Optional
+from importlib.metadata import version
+from typing import Any, Iterable, Optional, Union
 
-import spacy
 from spacy.language import Language
+from spacy.tokens import Doc, Span, Token
 from textblob import TextBlob
 from spacytextblob.spacytextblob import SpacyTextBlob
 from textblob.classifiers import NaiveBayesClassifier
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch.nn as nn
+import torch
+
+from .backend import BACKENDS, OnnxModel, get_model_id
+from .polarity import PatternSentiment
+from .registry import REGISTRY
 
 
 @dataclass
@@ -79,28 +83,52 @@ class AspectSentiment:
 class SentimentAnalysis:
     """Sentiment Analysis."""
 
-    nlp: Optional[Language] = None
+    @property
+    def nlp(self) -> Language:
+        """Shared blank English pipeline with spacytextblob only, no trained model to load."""
+        return REGISTRY.get("spacy", "blank:en", pipes=("spacytextblob",))
+
+    @property
+    def model_id(self) -> str:
+        """Model id and version for inference cache."""
+        return f"textblob@{version('textblob')}"
 
     def nlp_get(self, sentence: str) -> Sentiment:
         """Get Sentiment for sentence string."""
-        if not isinstance(self.nlp, Language):
-            self.nlp = spacy.load("en_core_web_sm")
-            self.nlp.add_pipe("spacytextblob")
-
-        doc = self.nlp(sentence)
-        return Sentiment(
-            polarity=doc._.blob.polarity,
-            seubjectivity=doc._.blob.subjectivity,
-        )
+        return self.nlp_get_many([sentence])[0]
+
+    def nlp_get_many(self, sentences: list[str], batch_size: int = 64) -> list[Sentiment]:
+        """Get list of Sentiment for list of sentence string, through tokenizer and spacytextblob only."""
+        return [
+            Sentiment(polarity=doc._.blob.polarity, subjectivity=doc._.blob.subjectivity)
+            for doc in self.nlp.pipe(sentences, batch_size=batch_size)
+        ]
+
+    def nlp_get_docs(self, docs: Iterable[Union[Doc, Span]]) -> list[Sentiment]:
+        """Get list of Sentiment for Docs or Spans already parsed, spacytextblob on their text."""
+        component = self.nlp.get_pipe("spacytextblob")
+        blobs = (component.get_blob(doc) for doc in docs)
+        return [Sentiment(polarity=blob.polarity, subjectivity=blob.subjectivity) for blob in blobs]
+
+    @property
+    def scorer(self) -> PatternSentiment:
+        """Pattern lexicon scorer, same polarity and subjectivity as TextBlob."""
+        return PatternSentiment()
 
     def get(self, sentence: str) -> Sentiment:
         """Get Sentiment for document string."""
-        blob = TextBlob(sentence)
-        # default sentiment type not assessible, use custom one here.
-        return Sentiment(
-            polarity=blob.polarity,
-            subjectivity=blob.subjectivity
-        )
+        polarity, subjectivity = self.scorer.score(sentence)
+        return Sentiment(polarity=polarity, subjectivity=subjectivity)
+
+    def get_many(self, sentences: list[str], n_process: int = 1) -> list[Sentiment]:
+        """Get list of Sentiment for list of sentence string."""
+        scores = self.scorer.score_many(sentences, n_process=n_process)
+        return [Sentiment(polarity=p, subjectivity=s) for p, s in scores]
+
+    def get_doc(self, doc: Union[Doc, Span]) -> Sentiment:
+        """Get Sentiment for parsed Doc or Span, reuse its tokens."""
+        polarity, subjectivity = self.scorer.score_doc(doc)
+        return Sentiment(polarity=polarity, subjectivity=subjectivity)
 
     def _train_aspect_sentiments(self, data: list[tuple[str, str]]) -> None:
         """Train custom aspect based sentiment analyzer."""
@@ -109,69 +137,177 @@ class SentimentAnalysis:
         for s in blob.sentences:
             print(s, s.classify())
 
-    def _get_aspect_sentiments(self, sentences: list[str]) -> list[AspectSentiment]:
-        """Get Aspect Sentiment for list of sentence string."""
-
-        model_name: str = "en_core_web_md"
-        nlp = spacy.load(model_name)
-
-        results: list[AspectSentiment] = []
-
-        data: list[dict] = []
-
-        for sentence in sentences:
-            doc = nlp(sentence)
-            descriptive_term = ""
-            target = ''
-            for token in doc:
-                if token.dep_ == 'nsubj' and token.pos_ == 'NOUN':
-                    target = token.text
-                if token.pos_ == "ADJ":
-                    prepend = ""
-                    for child in token.children:
-                        if child.pos_ != 'ADV':
-                            continue
-                        prepend += child.text + ' '
-                    descriptive_term = prepend + token.text
-            data.append({'aspect': target, 'description': descriptive_term})
-
-        for item in data:
-            item['sentiment'] = TextBlob(item['description']).sentiment
-            results.append(
-                AspectSentiment(
-                    name=item["aspect"],
-                    polarity=item["sentiment"].polarity,
-                    subjectivity=item["sentiment"].subjectivity,
+    @property
+    def nlp_aspect(self) -> Language:
+        """Shared spacy pipeline with dependency parse for aspect extraction."""
+        return REGISTRY.get("spacy", "en_core_web_md")
+
+    @staticmethod
+    def get_aspect_text(noun: Token) -> str:
+        """Aspect text of noun with its compound modifiers, e.g. internet speed."""
+        tokens = [child for child in noun.children if child.dep_ == "compound"] + [noun]
+        return " ".join(token.text for token in sorted(tokens, key=lambda x: x.i))
+
+    def get_aspect_pairs(self, doc: Doc) -> list[tuple[str, str]]:
+        """Get (aspect, descriptor) pairs from dependency parse in one pass.
+
+        Descriptor is an adjective with its adverb and negation children. Aspect
+        is the noun it modifies (amod), or the noun subject of its head (acomp),
+        or else the last noun subject seen in the sentence.
+        """
+        pairs: list[tuple[str, str]] = []
+        subject: Optional[Token] = None
+        for token in doc:
+            if token.dep_ in ("nsubj", "nsubjpass") and token.pos_ in ("NOUN", "PROPN"):
+                subject = token
+            if token.pos_ != "ADJ":
+                continue
+
+            words = [child for child in token.children if child.pos_ == "ADV" or child.dep_ == "neg"]
+            descriptor = " ".join(x.text for x in sorted(words + [token], key=lambda x: x.i))
+
+            aspect = None
+            if token.dep_ == "amod" and token.head.pos_ in ("NOUN", "PROPN"):
+                aspect = token.head
+            else:
+                aspect = next(
+                    (child for child in token.head.children
+                     if child.dep_ in ("nsubj", "nsubjpass") and child.pos_ in ("NOUN", "PROPN")),
+                    subject,
+                )
+            if aspect is not None:
+                pairs.append((self.get_aspect_text(aspect), descriptor))
+        return pairs
+
+    def get_aspect_sentiments(
+            self,
+            sentences: list[str],
+            batch_size: int = 64,
+            disable: tuple[str, ...] = ("ner", "lemmatizer")) -> list[list[AspectSentiment]]:
+        """Get list of AspectSentiment for each sentence string.
+
+        Sentences are parsed by `nlp.pipe` with pipes in `disable` skipped,
+        all descriptors are scored in one batch. Descriptor polarity is split
+        into positive, negative and neutral shares that sum to one.
+        """
+        nlp = self.nlp_aspect
+        disable = [name for name in disable if name in nlp.pipe_names]
+        pairs = [
+            self.get_aspect_pairs(doc)
+            for doc in nlp.pipe(sentences, batch_size=batch_size, disable=disable)
+        ]
+        scores = iter(self.scorer.score_many([descriptor for items in pairs for _, descriptor in items]))
+
+        results: list[list[AspectSentiment]] = []
+        for items in pairs:
+            results.append([])
+            for (aspect, _), (polarity, _) in zip(items, scores):
+                results[-1].append(
+                    AspectSentiment(
+                        aspect=aspect,
+                        positive=max(polarity, 0.0),
+                        negative=max(-polarity, 0.0),
+                        neutral=1.0 - abs(polarity),
+                    )
                 )
-            )
-
         return results
 
+    def _get_aspect_sentiments(self, sentences: list[str]) -> list[AspectSentiment]:
+        """Get Aspect Sentiment for list of sentence string."""
+        return [item for items in self.get_aspect_sentiments(sentences) for item in items]
+
 
 class AspectBasedSentimentAnalysis:
     """Aspect Based Sentiment Analysis."""
 
-    def __init__(self) -> None:
+    def __init__(self, backend: str = "torch", quantize: bool = False) -> None:
         """Init."""
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}: {backend}")
+
         self.model_name = "yangheng/deberta-v3-base-absa-v1.1"
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+
+        self.onnx: Optional[OnnxModel] = None
+        if backend == "onnx":
+            self.onnx = OnnxModel(
+                model=self.model,
+                model_name=self.model_name,
+                input_names=("input_ids", "attention_mask"),
+                quantize=quantize,
+            )
+
+    @property
+    def tokenizer(self) -> Any:
+        """Shared tokenizer from model registry."""
+        return REGISTRY.get("tokenizer", self.model_name)
+
+    @property
+    def model(self) -> Any:
+        """Shared model from model registry."""
+        return REGISTRY.get("classifier", self.model_name)
+
+    @property
+    def model_id(self) -> str:
+        """Model id and version for inference cache."""
+        return get_model_id(self.model_name, self.model, self.onnx)
 
     def get(self, sentence: str, aspect: str) -> AspectSentiment:
         """Get Sentiment Score from text str and list of aspect string."""
-        keys = ["negative","neutral","positive"]
-        input_str = "[CLS]" + sentence + "[SEP]" + aspect + "[SEP]"
-        # input_str = "[CLS] when tables opened up, the manager sat another party before us. [SEP] manager [SEP]"
-        inputs = self.tokenizer(input_str, return_tensors="pt")
-        outputs = self.model(**inputs)
-        softmax = nn.Softmax(dim=1)
-        outputs = softmax(outputs.logits)
-        results = [round(i,4) for i in outputs.tolist()[0]]
-
-        data = dict(zip(keys, results))
-        return AspectSentiment(
-            aspect=aspect,
-            positive=data["positive"],
-            negative=data["negative"],
-            neutral=data["neutral"],
+        return self.get_batch([(sentence, aspect)])[0]
+
+    @staticmethod
+    def tokenize(tokenizer: Any, sentences: list[str], aspects: list[str], return_tensors: str = "pt") -> dict:
+        """Tokenize sentences and aspects into padded sentence pair inputs."""
+        return tokenizer(sentences, aspects, padding=True, truncation=True, return_tensors=return_tensors)
+
+    def forward(self, model: Any, tokenizer: Any, sentences: list[str], aspects: list[str]) -> torch.Tensor:
+        """Get logits for padded batch of sentence pair inputs."""
+        if self.onnx:
+            return torch.from_numpy(self.onnx.run(self.tokenize(tokenizer, sentences, aspects, return_tensors="np")))
+        return model(**self.tokenize(tokenizer, sentences, aspects)).logits
+
+    def get_batch(self, pairs: list[tuple[str, str]], batch_size: int = 32) -> list[AspectSentiment]:
+        """Get list of AspectSentiment from list of (sentence, aspect), in input order.
+
+        Pairs are encoded as proper sentence pair inputs, sorted by length
+        and scored with one padded forward pass per batch. Model and
+        tokenizer are fetched once for the whole call.
+        """
+        model = None if self.onnx else self.model
+        tokenizer = self.tokenizer
+        results: list[Optional[AspectSentiment]] = [None] * len(pairs)
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+        with torch.inference_mode():
+            for start in range(0, len(order), batch_size):
+                index = order[start:start + batch_size]
+                logits = self.forward(
+                    model=model,
+                    tokenizer=tokenizer,
+                    sentences=[pairs[i][0] for i in index],
+                    aspects=[pairs[i][1] for i in index],
+                )
+                probs = logits.softmax(dim=-1).tolist()
+                for i, (negative, neutral, positive) in zip(index, probs):
+                    results[i] = AspectSentiment(
+                        aspect=pairs[i][1],
+                        positive=positive,
+                        negative=negative,
+                        neutral=neutral,
+                    )
+        return results
+
+    def get_aspects(self, sentence: str, aspects: list[str]) -> list[AspectSentiment]:
+        """Get list of AspectSentiment for all aspects of one sentence in a single pass."""
+        return self.get_batch([(sentence, aspect) for aspect in aspects], batch_size=max(len(aspects), 1))
+
+    def parity(self, pairs: list[tuple[str, str]]) -> float:
+        """Max absolute logits difference of onnx backend against torch."""
+        if not self.onnx:
+            raise ValueError("parity check requires backend='onnx'")
+        inputs = self.tokenize(
+            self.tokenizer,
+            sentences=[sentence for sentence, _ in pairs],
+            aspects=[aspect for _, aspect in pairs],
+            return_tensors="np",
         )
+        return self.onnx.parity(self.model, inputs)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""Columnar Storage For Semantic Pattern Sentences."""
+
+# Layout of output directory:
+# - strings.json: list of strings, ids are their spacy StringStore hash
+# - part-NNNNN/<column>.npy: one numpy array per column, loadable by mmap
+#
+# Columns per part:
+# - content level: cid, type, parent (uint64 ids), sent_offsets (int64)
+# - sentence level: text_offsets (int64), emotion (uint64 id),
+#   polarity, subjectivity (float32), logic, topic (bool),
+#   token_offsets, ent_offsets (int64)
+# - token level: lem, pos, tag, dep (uint64 ids)
+# - entity level: ent_text, ent_label (uint64 ids)
+# - text: utf-8 bytes of all sentence texts (uint8)
+#
+# strings.json is written last and marks a complete columnar directory.
+# Parts are written into a sibling `<dir_out>.tmp` directory, renamed into
+# place on close, so an existing output is only replaced by a complete one.
+
+from array import array
+from pathlib import Path
+from typing import Iterator, Union
+
+import numpy as np
+import orjson
+from spacy.strings import StringStore
+
+from ..base.io import IO
+
+
+__all__ = (
+    "ColumnarWriter",
+    "ColumnarReader",
+)
+
+
+ID_COLUMNS = ("cid", "type", "parent", "emotion", "lem", "pos", "tag", "dep", "ent_text", "ent_label")
+DTYPES = {"Q": np.uint64, "q": np.int64, "f": np.float32, "b": np.bool_}
+OFFSET_COLUMNS = {
+    "sent_offsets": "emotion",
+    "text_offsets": "text",
+    "token_offsets": "lem",
+    "ent_offsets": "ent_text",
+}
+
+
+class ColumnarWriter:
+    """Write Content records into columnar numpy parts."""
+
+    def __init__(self, dir_out: Union[str, Path], part_size: int = 100_000) -> None:
+        """Init, part_size is number of sentences per part.
+
+        Raises ValueError when dir_out is a non-empty directory without
+        columnar strings.json, which would be replaced on close.
+        """
+        self.dir_out = Path(dir_out)
+        if self.dir_out.exists() and not self.is_columnar(self.dir_out):
+            raise ValueError(f"not an empty or columnar directory: {self.dir_out}")
+        self.dir_tmp = self.dir_out.with_name(self.dir_out.name + ".tmp")
+        self.part_size = part_size
+        self.strings = StringStore()
+        self.parts = 0
+        IO.dir_del(self.dir_tmp)
+        IO.dir_create(self.dir_tmp)
+        self.reset()
+
+    @staticmethod
+    def is_columnar(dir_out: Path) -> bool:
+        """Check directory is empty or a complete columnar output."""
+        return dir_out.is_dir() and (not any(dir_out.iterdir()) or (dir_out / "strings.json").is_file())
+
+    def reset(self) -> None:
+        """Start new empty part."""
+        self.columns: dict[str, array] = {name: array("Q") for name in ID_COLUMNS}
+        self.columns.update({name: array("q", [0]) for name in OFFSET_COLUMNS})
+        self.columns.update({
+            "polarity": array("f"),
+            "subjectivity": array("f"),
+            "logic": array("b"),
+            "topic": array("b"),
+        })
+        self.text = bytearray()
+
+    def write(self, content: dict) -> None:
+        """Append one Content record in dict form, as saved in json lines."""
+        add = self.strings.add
+        columns = self.columns
+        columns["cid"].append(add(content["cid"]))
+        columns["type"].append(add(content["type"]))
+        columns["parent"].append(add(content["parent"]))
+
+        for sent in content["sents"]:
+            self.text += sent["text"].encode()
+            columns["text_offsets"].append(len(self.text))
+            for name in ("lem", "pos", "tag", "dep"):
+                columns[name].extend(add(x) for x in sent[name])
+            columns["token_offsets"].append(len(columns["lem"]))
+            for ent_text, ent_label in sent["ent"].items():
+                columns["ent_text"].append(add(ent_text))
+                columns["ent_label"].append(add(ent_label))
+            columns["ent_offsets"].append(len(columns["ent_text"]))
+
+            columns["emotion"].append(add(sent["emotion"]["tag"]))
+            columns["polarity"].append(sent["sentiment"]["polarity"])
+            columns["subjectivity"].append(sent["sentiment"]["subjectivity"])
+            columns["logic"].append(sent["logic"])
+            columns["topic"].append(sent["topic"])
+        columns["sent_offsets"].append(len(columns["emotion"]))
+
+        if len(columns["emotion"]) >= self.part_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Save current part as numpy arrays."""
+        if len(self.columns["cid"]) == 0:
+            return
+        dir_part = self.dir_tmp / f"part-{self.parts:05d}"
+        IO.dir_create(dir_part)
+        for name, values in self.columns.items():
+            np.save(dir_part / f"{name}.npy", np.frombuffer(values, dtype=DTYPES[values.typecode]))
+        np.save(dir_part / "text.npy", np.frombuffer(bytes(self.text), dtype=np.uint8))
+        self.parts += 1
+        self.reset()
+
+    def close(self) -> None:
+        """Save last part and string table, replace dir_out with written parts."""
+        self.flush()
+        IO.save_bytes(self.dir_tmp / "strings.json", orjson.dumps(list(self.strings)))
+        if self.dir_out.exists():
+            if not self.is_columnar(self.dir_out):
+                raise ValueError(f"not an empty or columnar directory: {self.dir_out}")
+            IO.dir_del(self.dir_out)
+        self.dir_tmp.rename(self.dir_out)
+
+    def discard(self) -> None:
+        """Drop written parts, keep dir_out as it is."""
+        IO.dir_del(self.dir_tmp)
+
+    def __enter__(self) -> "ColumnarWriter":
+        """Enter context."""
+        return self
+
+    def __exit__(self, exc_type: object, *args: object) -> None:
+        """Exit context, close writer, or discard parts on error."""
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class ColumnarReader:
+    """Read columnar parts written by ColumnarWriter."""
+
+    def __init__(self, dir_out: Union[str, Path]) -> None:
+        """Init, load string table."""
+        self.dir_out = Path(dir_out)
+        self.strings = StringStore(IO.load_list(self.dir_out / "strings.json"))
+
+    def iter_parts(self, mmap: bool = True) -> Iterator[dict[str, np.ndarray]]:
+        """Yield columns of each part, memory-mapped by default."""
+        mode = "r" if mmap else None
+        for dir_part in sorted(self.dir_out.glob("part-*")):
+            yield {
+                file.stem: np.load(file, mmap_mode=mode)
+                for file in dir_part.glob("*.npy")
+            }
+
+    def load(self) -> dict[str, np.ndarray]:
+        """Load all parts into one table of columns, offsets rebased."""
+        parts = list(self.iter_parts(mmap=False))
+        if not parts:
+            return {}
+        table: dict[str, np.ndarray] = {}
+        for name in parts[0]:
+            if name in OFFSET_COLUMNS:
+                base = 0
+                chunks = [np.zeros(1, dtype=np.int64)]
+                for part in parts:
+                    chunks.append(part[name][1:] + base)
+                    base += len(part[OFFSET_COLUMNS[name]])
+                table[name] = np.concatenate(chunks)
+            else:
+                table[name] = np.concatenate([part[name] for part in parts])
+        return table
+
+    def decode(self, ids: np.ndarray) -> list[str]:
+        """Decode array of string ids."""
+        return [self.strings[int(x)] for x in ids]
+
+    def to_id(self, text: str) -> int:
+        """String id of text."""
+        return self.strings[text]
+
+    @staticmethod
+    def get_text(table: dict[str, np.ndarray], index: int) -> str:
+        """Text of sentence at index."""
+        start, end = table["text_offsets"][index], table["text_offsets"][index + 1]
+        return table["text"][start:end].tobytes().decode()
+
+    def get_tokens(self, table: dict[str, np.ndarray], column: str, index: int) -> list[str]:
+        """Token strings of column (lem, pos, tag, dep) for sentence at index."""
+        start, end = table["token_offsets"][index], table["token_offsets"][index + 1]
+        return self.decode(table[column][start:end])
@@ -8,8 +8,10 @@ from pathlib import Path
 from datetime import datetime
 
 import spacy
+from spacy.language import Language
 from spacy.matcher import Matcher
 from spacy.matcher import PhraseMatcher
+from spacy.tokens import Doc
 
 from ..core.emotion import EmotionDetectorT5
 from ..core.emotion import EmotionDetectorRoberta
@@ -17,11 +19,31 @@ from ..core.sentiment import SentimentAnalysis, AspectBasedSentimentAnalysis
 from ..core.ngrams import NgramComponent
 from ..core.abbr import AbbreviationDetector
 from ..core.hyponym import HyponymDetector
+from ..core.parse_cache import ParseCache
 
 
 class AppDemo:
     """App Demo."""
 
+    parse_cache = False  # True to load parsed Docs from ParseCache on reruns
+
+    def __init__(self) -> None:
+        """Init, one ParseCache per pipeline for the whole run."""
+        self.parse_caches: dict[int, ParseCache] = {}
+
+    def parse(self, nlp: Language, text: str) -> Doc:
+        """Parse text, through ParseCache when parse_cache is on."""
+        if not self.parse_cache:
+            return nlp(text)
+        cache = self.parse_caches.get(id(nlp))
+        if cache is None or cache.nlp is not nlp:
+            cache = self.parse_caches[id(nlp)] = ParseCache(nlp)
+        return list(cache.pipe([text]))[0]
+
+    def close(self) -> None:
+        """Save pending parsed Docs of all ParseCache."""
+        for cache in self.parse_caches.values():
+            cache.close()
 
     def print_line(self, num: int = 2) -> None:
         """Print linebreak."""
@@ -157,7 +179,7 @@ class AppDemo:
         """Run Matcher."""
         nlp = spacy.load("en_core_web_sm")
         text = "This is a spaCy test."
-        doc = nlp(text)
+        doc = self.parse(nlp, text)
         for token in doc :
             print(token.text, token.pos_, token.lemma_)
         matcher = Matcher(nlp.vocab)
@@ -181,7 +203,7 @@ class AppDemo:
         matcher.add("some_patterns", patterns)
         matcher.add("1_more_pattern", patterns_2)
 
-        doc = nlp("Do you like it or do you love it ?")
+        doc = self.parse(nlp, "Do you like it or do you love it ?")
         # Apply your Matchers to the doc
         matches = phrase_matcher(doc)
         matches += matcher(doc)
@@ -204,6 +226,7 @@ class AppDemo:
         # self.run_hyponym()
         # self.run_coref()
         # self.run_matcher()
+        self.close()
 
 
 if __name__ == "__main__":
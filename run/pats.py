@@ -3,8 +3,17 @@
 """Find Spacy Semantic Patterns For Subreddit Content."""
 
 import json
+import multiprocessing
+import shutil
 import string
-from dataclasses import dataclass, asdict
+import threading
+from collections import Counter
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
 
 import markdown
 from bs4 import BeautifulSoup
@@ -12,14 +21,23 @@ from cleantext import clean
 from emoji import demojize
 
 import spacy
+import torch
 from spacy.language import Language
+from spacy.tokens import Doc, Span
 # from spacy.matcher import Matcher
 
-from ..base.io import IO
+from ..base.io import IO, JsonlWriter
+from ..base.stage import Stage, StagedPipeline
 from ..base.timer import timeit 
 from ..config import Config
-from ..core.emotion import EmotionDetectorRoberta
-from ..core.sentiment import SentimentAnalysis
+from .columnar import ColumnarWriter
+from ..core.cache import CachedDetector
+from ..core.clean import clean_texts
+from ..core.emotion import Emotion, EmotionDetectorRoberta
+from ..core.lexicon import LexiconComponent
+from ..core.parse_cache import ParseCache
+from ..core.registry import REGISTRY
+from ..core.sentiment import Sentiment, SentimentAnalysis
 
 
 @dataclass
@@ -65,29 +83,73 @@ class SemanticPatternFinder:
     logic_words = ["why", "what", "who", "where", "when", "which", "how"]
     topic_words = ["best", "top", "better", "worse", "worst", "bad", "most", "fact", "secret", "amazing", "guide", "review", "tutorial", "method"]
 
-    def __init__(self) -> None:
-        """Init."""
-        self.load_models()
+    # cheap sentence checks run in order before any model call, see `get_sents`
+    # - rubbish: length and letter ratio on raw text
+    # - english: ascii letters and english stop words on tokens
+    # - relevant: has logic or topic words on lemmas
+    prefilters = ("rubbish",)
+
+    # True to score sentiment on sentence tokens of the parse, False for text through inference cache
+    sentiment_from_parse = False
+
+    def __init__(
+            self,
+            name: str = "pats",
+            load: bool = True,
+            prefilters: Optional[tuple[str, ...]] = None,
+            parse_cache: bool = False) -> None:
+        """Init, name for output files, load=False to skip loading models.
+
+        parse_cache=True keeps parsed Docs on disk, reruns skip spaCy parsing.
+        """
+        self.name = name
+        self.parse_cache = parse_cache
+        self._parser: Optional[ParseCache] = None
+        if prefilters is not None:
+            self.prefilters = prefilters
+        for prefilter in self.prefilters:
+            if not hasattr(self, f"check_{prefilter}"):
+                raise ValueError(f"unknown prefilter: {prefilter}")
+
+        self.lexicon = LexiconComponent({"logic": self.logic_words, "topic": self.topic_words})
+        self.drops: Counter = Counter()
+        self.drops_lock = threading.Lock()
+        if load:
+            self.load_models()
 
     @timeit
     def load_models(self) -> None:
         """Load Language Models."""
-        self.nlp = spacy.load("en_core_web_sm")
-        self.nlp.add_pipe("sentencizer")
-        self.nlp.add_pipe("merge_entities")
-        self.nlp.add_pipe("merge_noun_chunks")
-
-        self.app_ed = EmotionDetectorRoberta()
-        self.app_sa = SentimentAnalysis()
+        self.nlp = REGISTRY.get(
+            "spacy",
+            "en_core_web_sm",
+            pipes=("sentencizer", "merge_entities", "merge_noun_chunks"),
+        )
+
+        self.app_ed = CachedDetector(EmotionDetectorRoberta(), result_cls=Emotion)
+        self.app_sa = CachedDetector(SentimentAnalysis(), result_cls=Sentiment)
+
+    @property
+    def parser(self) -> Union[Language, ParseCache]:
+        """Get nlp, or ParseCache over nlp when parse_cache is on."""
+        if not self.parse_cache:
+            return self.nlp
+        if self._parser is None or self._parser.nlp is not self.nlp:
+            self._parser = ParseCache(self.nlp)
+        return self._parser
 
     def clean_up(self, text: str) -> str:
         """Clean up subreddit contents."""
         html = markdown.markdown(text)
         soup = BeautifulSoup(html, features='html.parser')
         text = soup.get_text()
-        text = demojize(text, use_aliases=True)
+        text = demojize(text, language="alias")
         return clean(text, lower=False)
 
+    def clean_ups(self, texts: list[str], n_process: int = 1) -> list[str]:
+        """Clean up batch of subreddit contents, fast regex version of `clean_up`."""
+        return clean_texts(texts, n_process=n_process)
+
     def is_rubbish(self, sentence: str) -> bool:
         """Check if text contain too much none-letter characters."""
         num = len(sentence)
@@ -101,19 +163,37 @@ class SemanticPatternFinder:
 
     def is_logic(self, lemmas: list[str]) -> bool:
         """Is list of token.lemma_ has logic words."""
-        lemmas = [x.lower() for x in lemmas]
-        for lemma in lemmas:
-            if lemma in self.logic_words:
-                return True
-        return False
+        return not self.lexicon.words["logic"].isdisjoint(x.lower() for x in lemmas)
 
     def is_topic(self, lemmas: list[str]) -> bool:
         """Is list of token.lemma_ has topic words."""
-        lemmas = [x.lower() for x in lemmas]
-        for lemma in lemmas:
-            if lemma in self.topic_words:
-                return True
-        return False
+        return not self.lexicon.words["topic"].isdisjoint(x.lower() for x in lemmas)
+
+    def is_english(self, sent: Span) -> bool:
+        """Is sentence english: mostly ascii letters and has english stop words."""
+        alpha = [char for char in sent.text if char.isalpha()]
+        if not alpha:
+            return False
+        ascii_letters = [char for char in alpha if char in string.ascii_letters]
+        if len(ascii_letters) / len(alpha) < 0.8:
+            return False
+        return any(tk.is_stop for tk in sent)
+
+    def check_rubbish(self, sent: Span) -> bool:
+        """Prefilter: keep sentence not rubbish."""
+        return not self.is_rubbish(sent.text)
+
+    def check_english(self, sent: Span) -> bool:
+        """Prefilter: keep english sentence."""
+        return self.is_english(sent)
+
+    def check_relevant(self, sent: Span) -> bool:
+        """Prefilter: keep sentence with logic or topic words."""
+        return sent._.has_logic or sent._.has_topic
+
+    def report_filters(self) -> dict:
+        """Number of sentences dropped by each prefilter and kept."""
+        return {prefilter: self.drops[prefilter] for prefilter in (*self.prefilters, "kept")}
 
     def get_emotion(self, text: str) -> str:
         """Get Emotion from text string."""
@@ -121,12 +201,26 @@ class SemanticPatternFinder:
         # return emotion.tag
         return emotion
 
+    def get_emotions(self, texts: list[str]) -> list[Emotion]:
+        """Get list of Emotion from list of text string in batches."""
+        return self.app_ed.get_many(texts)
+
     def get_sentiment(self, text: str) -> str:
         """Get Sentiment from text string."""
         sentiment = self.app_sa.get(sentence=text)
         # return sentiment.mark
         return sentiment
 
+    def get_sentiments(self, texts: list[str]) -> list[Sentiment]:
+        """Get list of Sentiment from list of text string in batches."""
+        return self.app_sa.get_many(texts)
+
+    def get_sentiments_parsed(self, sents: list[Span]) -> list[Sentiment]:
+        """Get list of Sentiment from list of sentence Span, reuse tokens of the parse."""
+        if not self.sentiment_from_parse:
+            return self.get_sentiments([sent.text for sent in sents])
+        return [self.app_sa.get_doc(sent) for sent in sents]
+
 
     @timeit
     def load_contents(self, sr_name: str) -> list[dict]:
@@ -152,79 +246,315 @@ class SemanticPatternFinder:
 
         return nlp
 
+    @property
+    def file_out(self) -> Path:
+        """Analysis output file in json lines."""
+        return self.config.dir_tmp / f"{self.name}.jsonl"
+
     def save(self, contents: list[Content]) -> bool:
-        """Save analysis data."""
-        file = self.config.dir_tmp / "pats.json"
-        data = [asdict(x) for x in contents]
-        IO.save_list_dict(file_name=file, file_data=data)
-        return file.is_file()
+        """Append analysis data to output file."""
+        with JsonlWriter(self.file_out) as writer:
+            writer.write_many(contents)
+        return self.file_out.is_file()
+
+    @property
+    def file_ckpt(self) -> Path:
+        """Analysis checkpoint file."""
+        return self.config.dir_tmp / f"{self.name}.ckpt.json"
+
+    def load_checkpoint(self) -> dict:
+        """Load checkpoint of committed input offset and output size."""
+        if self.file_ckpt.is_file():
+            return IO.load_dict(self.file_ckpt)
+        return {}
+
+    def save_checkpoint(self, source: str, offset: int, size: int) -> bool:
+        """Save checkpoint atomically: source name, input offset, output size."""
+        file_tmp = self.file_ckpt.with_suffix(".tmp")
+        IO.save_dict(file_tmp, {"source": source, "offset": offset, "size": size})
+        file_tmp.replace(self.file_ckpt)
+        return self.file_ckpt.is_file()
+
+    def load_results(self, use_mmap: bool = True) -> Iterator[dict]:
+        """Stream saved Content records back from output file."""
+        return IO.iter_jsonl(self.file_out, use_mmap=use_mmap)
+
+    def make_sentence(self, sent: Span, emotion: Emotion, sentiment: Sentiment) -> Sentence:
+        """Make Sentence from sentence Span and model results."""
+        return Sentence(
+            text=sent.text, 
+            lem=[tk.lemma_ for tk in sent],
+            ent={ent.text: ent.label_ for ent in sent.ents},
+            pos=[tk.pos_ for tk in sent],
+            tag=[tk.tag_ for tk in sent],
+            dep=[tk.dep_ for tk in sent],
+            emotion=emotion,
+            sentiment=sentiment,
+            logic=sent._.has_logic,
+            topic=sent._.has_topic,
+        )
+
+    def make_sentences(self, sents: list[Span]) -> list[Sentence]:
+        """Make list of Sentence from list of sentence Span, models run in batches."""
+        texts = [sent.text for sent in sents]
+        emotions = self.get_emotions(texts)
+        sentiments = self.get_sentiments_parsed(sents)
+        return [
+            self.make_sentence(sent, emotion, sentiment)
+            for sent, emotion, sentiment in zip(sents, emotions, sentiments)
+        ]
+
+    def get_sents(self, doc: Doc) -> list[Span]:
+        """Get list of sentence Span passing all prefilters from Doc, set lexicon flags."""
+        self.lexicon(doc)
+        checks = [(prefilter, getattr(self, f"check_{prefilter}")) for prefilter in self.prefilters]
+        drops: Counter = Counter()
+        sents: list[Span] = []
+        for sent in doc.sents:
+            for prefilter, check in checks:
+                if not check(sent):
+                    drops[prefilter] += 1
+                    break
+            else:
+                sents.append(sent)
+        drops["kept"] = len(sents)
+        with self.drops_lock:
+            self.drops.update(drops)
+        return sents
 
     def process(self, texts: list[str]) -> list[Sentence]:
         """Process text string into list of Sentence."""
-        result: list[Sentence] = []
-        for text in texts:
-            doc = self.nlp(text)
-            for sent in doc.sents:
-                if self.is_rubbish(sent.text):
-                    continue
-                sentence = Sentence(
-                    text=sent.text, 
-                    lem=[tk.lemma_ for tk in sent],
-                    ent={ent.text: ent.label_ for ent in sent.ents},
-                    pos=[tk.pos_ for tk in sent],
-                    tag=[tk.tag_ for tk in sent],
-                    dep=[tk.dep_ for tk in sent],
-                    emotion=self.get_emotion(sent.text),
-                    sentiment=self.get_sentiment(sent.text),
-                    logic=self.is_logic(lemmas=[tk.lemma_ for tk in sent]),
-                    topic=self.is_topic(lemmas=[tk.lemma_ for tk in sent]),
-                )
-                result.append(sentence)
-        return result
+        sents = [sent for doc in self.parser.pipe(texts) for sent in self.get_sents(doc)]
+        return self.make_sentences(sents)
 
-    def analysis(self, data: list[dict]) -> list[Content]:
-        """Analysis each piece of contents by spacy."""
-        contents: list[Content] = []
+    def iter_items(self, data: Iterable[dict]) -> Iterator[tuple[str, str, str, str]]:
+        """Flatten submission/comment/reply tree into (cid, type, parent, text)."""
         for sub in data:
-            texts: list[str] = [sub["title"], sub["selftext"]]
-            contents.append(
-                Content(
-                    cid=sub["id"],
-                    type="submission",
-                    parent="",
-                    sents=self.process(texts=texts)
-                )
-            )
-
+            yield sub["id"], "submission", "", sub["title"]
+            yield sub["id"], "submission", "", sub["selftext"]
             for com in sub["comments"]:
-                texts = [com["body"]]
-                contents.append(
-                    Content(
-                        cid=com["id"],
-                        type="comment",
-                        parent=com["parent_id"],
-                        sents=self.process(texts=texts)
-                    )
-                )
-
+                yield com["id"], "comment", com["parent_id"], com["body"]
                 for rep in com["replies"]:
-                    texts = [rep["body"]]
-                    contents.append(
-                        Content(
-                            cid=rep["id"],
-                            type="reply",
-                            parent=rep["parent_id"],
-                            sents=self.process(texts=texts)
-                        )
-                    )
-
-            if contents:
-                self.save(contents=contents)
-
-            if self.debug:
+                    yield rep["id"], "reply", rep["parent_id"], rep["body"]
+
+    def iter_contents(self, data: Iterable[dict], batch_size: int = 64, n_process: int = 1) -> Iterator[Content]:
+        """Stream Content from subreddit data through nlp.pipe.
+
+        Texts are parsed in batches of `batch_size`, emotion and sentiment
+        run once per batch, and only one batch is held in memory at a time.
+        """
+        stream = (
+            (text, (cid, kind, parent))
+            for cid, kind, parent, text in self.iter_items(data)
+        )
+        docs = self.parser.pipe(stream, as_tuples=True, batch_size=batch_size, n_process=n_process)
+
+        current: Optional[Content] = None
+        while True:
+            chunk = list(islice(docs, batch_size))
+            if not chunk:
                 break
 
-        return contents
+            kept = [self.get_sents(doc) for doc, _ in chunk]
+            sentences = iter(self.make_sentences([sent for sents in kept for sent in sents]))
+
+            for (_, (cid, kind, parent)), sents in zip(chunk, kept):
+                if current and current.cid != cid:
+                    yield current
+                    current = None
+                if current is None:
+                    current = Content(cid=cid, type=kind, parent=parent, sents=[])
+                current.sents.extend(islice(sentences, len(sents)))
+
+        if current:
+            yield current
+
+    def stage_parse(self, items: list[tuple[str, str, str, str]]) -> list[dict]:
+        """Pipeline stage: parse texts, keep sentences not rubbish."""
+        docs = list(self.parser.pipe([text for *_, text in items]))
+        return [
+            {"item": item, "sents": self.get_sents(doc)}
+            for item, doc in zip(items, docs)
+        ]
+
+    def stage_emotion(self, records: list[dict]) -> list[dict]:
+        """Pipeline stage: emotion for all sentences of batch."""
+        emotions = iter(self.get_emotions([sent.text for record in records for sent in record["sents"]]))
+        for record in records:
+            record["emotions"] = list(islice(emotions, len(record["sents"])))
+        return records
+
+    def stage_sentiment(self, records: list[dict]) -> list[dict]:
+        """Pipeline stage: sentiment for all sentences of batch."""
+        sentiments = iter(self.get_sentiments_parsed([sent for record in records for sent in record["sents"]]))
+        for record in records:
+            record["sentiments"] = list(islice(sentiments, len(record["sents"])))
+        return records
+
+    def iter_contents_staged(
+            self,
+            data: Iterable[dict],
+            batch_size: int = 64,
+            maxsize: int = 4,
+            workers: tuple[int, int, int] = (1, 1, 2)) -> Iterator[Content]:
+        """Stream Content through parse, emotion and sentiment stages.
+
+        Stages run concurrently on their own worker threads, linked by
+        queues holding at most `maxsize` batches. See `self.pipeline.report()`
+        for per stage throughput and queue depth.
+
+        The parse stage always runs on one worker: its threads would share
+        one spaCy pipeline and parse cache. `workers[0]` is kept for the
+        signature and clamped to 1. Stopping iteration early stops
+        the stage threads.
+        """
+        self.pipeline = StagedPipeline(
+            stages=[
+                Stage("parse", self.stage_parse, workers=1),
+                Stage("emotion", self.stage_emotion, workers=workers[1]),
+                Stage("sentiment", self.stage_sentiment, workers=workers[2]),
+            ],
+            batch_size=batch_size,
+            maxsize=maxsize,
+        )
+
+        current: Optional[Content] = None
+        with closing(self.pipeline.run(self.iter_items(data))) as records:
+            for record in records:
+                cid, kind, parent, _ = record["item"]
+                if current and current.cid != cid:
+                    yield current
+                    current = None
+                if current is None:
+                    current = Content(cid=cid, type=kind, parent=parent, sents=[])
+                current.sents.extend(
+                    self.make_sentence(sent, emotion, sentiment)
+                    for sent, emotion, sentiment in zip(record["sents"], record["emotions"], record["sentiments"])
+                )
+
+        if current:
+            yield current
+
+    def analysis(
+            self,
+            data: list[dict],
+            source: str = "",
+            resume: bool = True,
+            commit_every: int = 10,
+            batch_size: int = 64,
+            staged: bool = False,
+            n_process: int = 1) -> int:
+        """Analysis each piece of contents by spacy, append each Content to output file.
+
+        Every `commit_every` submissions the output is fsynced and the input
+        offset checkpointed. With `resume`, a run over the same source skips
+        committed submissions and cids already in the output. With `staged`,
+        models run on concurrent stages and stage metrics are printed.
+        `n_process` is the number of `nlp.pipe` processes, not used with `staged`.
+        """
+        if self.debug:
+            data = data[:1]
+
+        offset, size = 0, 0
+        ckpt = self.load_checkpoint()
+        if resume and ckpt.get("source") == source and self.file_out.is_file():
+            offset, size = ckpt["offset"], ckpt["size"]
+
+        IO.dir_create(self.file_out.parent)
+        with open(self.file_out, "ab") as file:
+            file.truncate(size)  # drop records written after last commit
+
+        done = {record["cid"] for record in self.load_results()} if size else set()
+        index = {sub["id"]: i for i, sub in enumerate(data)}
+        pending = (sub for sub in data[offset:] if sub["id"] not in done)
+
+        count = 0
+        with JsonlWriter(self.file_out) as writer:
+            if staged:
+                contents = self.iter_contents_staged(pending, batch_size=batch_size)
+            else:
+                contents = self.iter_contents(pending, batch_size=batch_size, n_process=n_process)
+            for content in contents:
+                if content.type == "submission" and index[content.cid] - offset >= commit_every:
+                    offset = index[content.cid]
+                    self.save_checkpoint(source=source, offset=offset, size=writer.commit())
+                writer.write(content)
+                count += 1
+            self.save_checkpoint(source=source, offset=len(data), size=writer.commit())
+
+        print(f"prefilters: {self.report_filters()}")
+        if self._parser:
+            self._parser.close()
+            print(f"parse cache: {self._parser.stats}")
+        if staged:
+            for report in self.pipeline.report():
+                print(report)
+        return count
+
+    @property
+    def dir_columnar(self) -> Path:
+        """Analysis output directory in columnar numpy parts."""
+        return self.config.dir_tmp / f"{self.name}.columnar"
+
+    def to_columnar(self, part_size: int = 100_000) -> Path:
+        """Convert json lines output into columnar parts, see `ColumnarReader`."""
+        with ColumnarWriter(self.dir_columnar, part_size=part_size) as writer:
+            for record in self.load_results():
+                writer.write(record)
+        return self.dir_columnar
+
+    def split(self, data: list[dict], workers: int) -> list[list[dict]]:
+        """Split submissions into contiguous shards, deterministic for same input."""
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1: {workers}")
+        size = -(-len(data) // workers) if data else 1
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def merge(self, names: list[str]) -> int:
+        """Merge shard output files in shard order into output file."""
+        IO.dir_create(self.file_out.parent)
+        with open(self.file_out, "wb") as file:
+            for name in names:
+                with open(self.config.dir_tmp / f"{name}.jsonl", "rb") as shard:
+                    shutil.copyfileobj(shard, file)
+        return sum(1 for _ in self.load_results())
+
+    def analysis_sharded(self, data: list[dict], source: str = "", workers: int = 4, threads: int = 1) -> int:
+        """Analysis shards of submissions in worker processes, then merge.
+
+        Each worker loads models once, uses `threads` torch threads, and
+        writes and checkpoints its own shard, so reruns resume per shard.
+        Workers are instances of the same class, a subclass loads its own
+        models in worker processes too.
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1: {workers}")
+        if self.debug:
+            data = data[:1]
+
+        shards = self.split(data, workers=workers)
+        jobs = [
+            (f"{self.name}.shard-{i:03d}", f"{source}#{i}/{len(shards)}", shard)
+            for i, shard in enumerate(shards)
+        ]
+        options = {
+            "cls": type(self),
+            "prefilters": self.prefilters,
+            "parse_cache": self.parse_cache,
+            "sentiment_from_parse": self.sentiment_from_parse,
+        }
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+                max_workers=len(jobs) or 1,
+                mp_context=context,
+                initializer=init_worker,
+                initargs=(threads, options)) as executor:
+            results = list(executor.map(run_shard, jobs))
+
+        for _, drops in results:
+            self.drops.update(drops)
+        print(f"prefilters: {self.report_filters()}")
+        return self.merge([name for name, _ in results])
 
     @timeit
     def run(self) -> None:
@@ -232,9 +562,18 @@ class SemanticPatternFinder:
         self.debug = False
         sr_name = "nosurf"
         data = self.load_contents(sr_name=sr_name)
-        contents = self.analysis(data=data)
-        assert self.save(contents=contents)
+        self.analysis(data=data, source=sr_name)
+        assert self.file_out.is_file()
  
+    @timeit
+    def run_sharded(self) -> None:
+        """Run in worker processes."""
+        self.debug = False
+        sr_name = "nosurf"
+        data = self.load_contents(sr_name=sr_name)
+        self.analysis_sharded(data=data, source=sr_name, workers=4, threads=1)
+        assert self.file_out.is_file()
+
     @timeit
     def run_test(self) -> None:
         """Run test."""
@@ -259,5 +598,26 @@ class SemanticPatternFinder:
         # product feature extraction
 
 
+worker: Optional[SemanticPatternFinder] = None
+
+
+def init_worker(threads: int, options: dict) -> None:
+    """Init worker process: limit torch threads, load models once, same options as parent."""
+    global worker
+    torch.set_num_threads(threads)
+    worker = options["cls"](prefilters=options["prefilters"], parse_cache=options["parse_cache"])
+    worker.sentiment_from_parse = options["sentiment_from_parse"]
+    worker.debug = False
+
+
+def run_shard(job: tuple[str, str, list[dict]]) -> tuple[str, dict]:
+    """Analysis one shard of submissions in worker process, return shard name and prefilter drops."""
+    name, source, data = job
+    worker.name = name
+    worker.drops = Counter()
+    worker.analysis(data=data, source=source)
+    return name, dict(worker.drops)
+
+
 if __name__ == "__main__":
     SemanticPatternFinder().run_test()
\ No newline at end of file
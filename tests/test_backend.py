@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test ONNX Runtime Backend Parity."""
+
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import torch
+from transformers import BertConfig, BertForSequenceClassification, T5Config, T5ForConditionalGeneration
+
+from ..base.io import IO
+from ..core.backend import OnnxModel
+from ..core.emotion import EmotionDetectorT5, EmotionDetectorRoberta
+from ..core.sentiment import AspectBasedSentimentAnalysis
+
+
+class TestOnnxBackend:
+    """Test onnx backend against torch backend."""
+
+    dir_test = Path(__file__).parent / "test"
+
+    texts = [
+        "i feel as if i havent blogged in ages are at least truly blogged i am doing an update cute",
+        "i have a feeling i kinda lost my best friend",
+        "i am so angry right now",
+        "what a lovely surprise",
+    ]
+
+    pairs = [
+        ("The pan I received was not in the same league as my old pan, new is cheap feeling and does not have a plate on the bottom.", "pan"),
+        ("It took some time to clean and maintain, but totally worth it!", "clean"),
+    ]
+
+    def test_export_t5(self) -> None:
+        """Test export of tiny random T5 with decoder length other than encoder length."""
+        torch.manual_seed(0)
+        config = T5Config(vocab_size=32, d_model=16, d_kv=8, d_ff=32, num_layers=1, num_heads=2, decoder_start_token_id=0)
+        model = T5ForConditionalGeneration(config)
+        onnx = OnnxModel(
+            model=model,
+            model_name="tiny/t5",
+            input_names=("input_ids", "attention_mask", "decoder_input_ids"),
+            dir_cache=self.dir_test / "onnx",
+        )
+        assert onnx.file_onnx.name == "tiny--t5.fp32.onnx"
+        for batch, length, steps in ((1, 5, 1), (2, 9, 1), (3, 4, 2)):
+            inputs = {
+                "input_ids": np.random.randint(2, 32, (batch, length)),
+                "attention_mask": np.ones((batch, length), dtype=np.int64),
+                "decoder_input_ids": np.zeros((batch, steps), dtype=np.int64),
+            }
+            assert onnx.run(inputs).shape == (batch, steps, 32)
+            assert onnx.parity(model, inputs) < 1e-4
+
+    def test_export_quantize(self) -> None:
+        """Test int8 file is quantized from the cached fp32 export of tiny random classifier."""
+        IO.dir_del(self.dir_test / "onnx")
+        torch.manual_seed(0)
+        config = BertConfig(vocab_size=32, hidden_size=16, num_hidden_layers=1, num_attention_heads=2, intermediate_size=32, num_labels=3)
+        model = BertForSequenceClassification(config)
+        model.config._commit_hash = "abc123"
+        kwargs = {"model_name": "tiny/bert", "input_names": ("input_ids", "attention_mask"), "dir_cache": self.dir_test / "onnx"}
+
+        onnx = OnnxModel(model=model, **kwargs)
+        inputs = {"input_ids": np.random.randint(2, 32, (2, 7)), "attention_mask": np.ones((2, 7), dtype=np.int64)}
+        assert onnx.file_onnx.name == "tiny--bert@abc123.fp32.onnx"
+        assert onnx.parity(model, inputs) < 1e-4
+        mtime = onnx.file_fp32.stat().st_mtime_ns
+
+        onnx_int8 = OnnxModel(model=model, quantize=True, **kwargs)
+        assert onnx_int8.file_onnx.name == "tiny--bert@abc123.int8.onnx"
+        assert onnx_int8.file_onnx.is_file()
+        assert onnx_int8.file_fp32.stat().st_mtime_ns == mtime
+        assert onnx_int8.run(inputs).shape == (2, 3)
+
+    def test_cleanup(self) -> None:
+        """Test clean up test dir."""
+        assert IO.dir_del(dir_name=self.dir_test)
+
+    def run_emotion(self, quantize: bool) -> None:
+        """Run emotion detectors on both backends."""
+        for cls in (EmotionDetectorT5, EmotionDetectorRoberta):
+            nlp_pt = cls()
+            nlp_ox = cls(backend="onnx", quantize=quantize)
+
+            start_time = datetime.now()
+            tags = [emo.tag for emo in nlp_ox.get_many(self.texts)]
+            end_time = datetime.now()
+
+            diff = nlp_ox.parity(self.texts)
+            print(f"\n{cls.__name__} quantize={quantize} max logits diff: {diff:.6f}")
+            print('Duration: {}'.format(end_time - start_time))
+            if not quantize:
+                assert diff < 1e-3
+            assert tags == [emo.tag for emo in nlp_pt.get_many(self.texts)]
+            assert nlp_ox.get(self.texts[0]).tag == tags[0]
+
+    def run_aspect(self, quantize: bool) -> None:
+        """Run aspect sentiment on both backends."""
+        nlp_pt = AspectBasedSentimentAnalysis()
+        nlp_ox = AspectBasedSentimentAnalysis(backend="onnx", quantize=quantize)
+
+        diff = nlp_ox.parity(self.pairs)
+        print(f"\nAspectBasedSentimentAnalysis quantize={quantize} max logits diff: {diff:.6f}")
+        if not quantize:
+            assert diff < 1e-3
+        for sentence, aspect in self.pairs:
+            assert nlp_ox.get(sentence, aspect).mark == nlp_pt.get(sentence, aspect).mark
+
+    def run(self) -> None:
+        """Run."""
+        for quantize in (False, True):
+            self.run_emotion(quantize=quantize)
+            self.run_aspect(quantize=quantize)
+
+
+if __name__ == "__main__":
+    TestOnnxBackend().run()
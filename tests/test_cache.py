@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test Inference Cache."""
+
+from pathlib import Path
+
+from ..base.io import IO
+from ..core.cache import CachedDetector, InferenceCache
+from ..core.emotion import Emotion
+
+
+class FakeDetector:
+    """Fake detector counting model calls."""
+
+    def __init__(self, model_id: str) -> None:
+        """Init."""
+        self.model_id = model_id
+        self.calls = 0
+
+    def get(self, text: str) -> Emotion:
+        """Get Emotion from text."""
+        self.calls += 1
+        return Emotion(tag=text.split()[0], emoji="")
+
+
+class FakeAspectDetector(FakeDetector):
+    """Fake aspect detector with two argument `get`."""
+
+    def get(self, sentence: str, aspect: str) -> Emotion:
+        """Get Emotion tagged with aspect and first word of sentence."""
+        self.calls += 1
+        return Emotion(tag=f"{aspect}:{sentence.split()[0]}", emoji="")
+
+
+class TestInferenceCache:
+    """Test Inference Cache."""
+
+    dir_test = Path(__file__).parent / "test"
+
+    def test_tiers(self) -> None:
+        """Test memory tier, disk tier and hit rate."""
+        file = self.dir_test / "cache.sqlite"
+        IO.file_del(file)
+
+        detector = FakeDetector(model_id="fake@1")
+        app = CachedDetector(detector, result_cls=Emotion, file=file)
+        texts = ["joy to all", "anger  issues", "joy to  all", "thanks!"]
+        assert [x.tag for x in app.get_many(texts)] == ["joy", "anger", "joy", "thanks!"]
+        assert detector.calls == 3
+        assert app.get("joy to all").tag == "joy"
+        assert app.get(text="anger issues").tag == "anger"
+        assert detector.calls == 3
+        assert app.cache.stats["memory"] == 2
+        app.cache.close()
+
+        detector = FakeDetector(model_id="fake@1")
+        app = CachedDetector(detector, result_cls=Emotion, file=file)
+        assert [x.tag for x in app.get_many(texts)] == ["joy", "anger", "joy", "thanks!"]
+        assert detector.calls == 0
+        assert app.cache.stats["disk"] == 4
+        assert app.cache.hit_rate == 1.0
+        app.cache.close()
+
+        detector = FakeDetector(model_id="fake@2")
+        app = CachedDetector(detector, result_cls=Emotion, file=file)
+        app.get_many(texts)
+        assert detector.calls == 3
+        assert app.cache.hit_rate == 0.0
+        app.cache.close()
+
+        detector = FakeDetector(model_id="fake@1")
+        app = CachedDetector(detector, result_cls=Emotion, file=file)
+        app.get_many(texts)
+        assert detector.calls == 0
+        app.cache.close()
+
+    def test_keywords(self) -> None:
+        """Test keyword order gives same cache key and argument positions."""
+        file = self.dir_test / "cache-keywords.sqlite"
+        IO.file_del(file)
+
+        detector = FakeAspectDetector(model_id="fake-aspect@1")
+        app = CachedDetector(detector, result_cls=Emotion, file=file)
+        assert app.get(aspect="pan", sentence="good pan").tag == "pan:good"
+        assert app.get(sentence="good pan", aspect="pan").tag == "pan:good"
+        assert app.get("good pan", aspect="pan").tag == "pan:good"
+        assert app.get_many([("good pan", "pan")])[0].tag == "pan:good"
+        assert detector.calls == 1
+        app.cache.close()
+
+    @staticmethod
+    def test_file_name() -> None:
+        """Test default file differs per backend and revision of one model."""
+        ids = ["org/model@abc:torch", "org/model@abc:onnx", "org/model@abc:onnx-int8", "org/model@def:torch"]
+        files = [InferenceCache.get_file(model_id) for model_id in ids]
+        assert len(set(files)) == 4
+        assert files[1].name.startswith("org--model-onnx-")
+
+    def test_cleanup(self) -> None:
+        """Test clean up test dir."""
+        assert IO.dir_del(dir_name=self.dir_test)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test Fast Text Clean Up against SemanticPatternFinder.clean_up."""
+
+from ..core.clean import clean_text, clean_texts
+from ..run.pats import SemanticPatternFinder
+
+
+SAME = [
+    "Hello **world**, this is *great* and _nice_ but snake_case_name stays.",
+    "# Title\n\nSome paragraph\nwith two lines.\n\n\n\nAnother one.",
+    "Check [this link](https://example.com) and ![img](http://x/y.png) too.",
+    "> quoted text\n> more\n\nreply here",
+    "&gt; reddit quote &amp; entities &lt;3",
+    "it&#39;s &quot;fine&quot;",
+    "* item one\n* item two\n- item three\n1. first\n2. second",
+    "  - nested\n    - deeper item",
+    "Use `pip install x` to install.",
+    "Escaped \\*stars\\* and \\_under\\_",
+    "Auto <https://reddit.com> link",
+    "raw <b>bold</b> html <br> tag",
+    "---\n\nAfter rule\n\n***",
+    "Header\n======\n\ntext",
+    "#hashtag at start",
+    "__strong under__ and **bold *nested* text**",
+    "**unclosed bold",
+    "2 * 3 * 4 = 24",
+    "a_b_c and *a*b",
+    "Link [text][ref]\n\n[ref]: http://example.com",
+    "~~strike~~ stays",
+    "    indented code block\n\ntext",
+    "```\nfenced code\n```",
+    "http://plain.url/path_with_under_score_",
+    "café naïve résumé “smart quotes” ‘single’",
+    "em — dash and ellipsis…",
+    "Tabs\tand   many    spaces   ",
+    "Line with trailing  \nnext line",
+    "mixed\r\nwindows\r\nlines",
+]
+
+# text, fast output; clean_up differs because
+# - emoji: `cleantext.clean` emojizes the `:alias:` names back, fast version keeps names
+# - block html: BeautifulSoup keeps line break after block tags, fast version drops all tags
+DIFFERENT = [
+    ("I love it 😀", "I love it :grinning:"),
+    ("thumbs 👍🏽 and family 👨‍👩‍👧", "thumbs :thumbs_up_medium_skin_tone: and family :family_man_woman_girl:"),
+    ("keycap 1️⃣ and ©", "keycap :one: and :copyright:"),
+    ("<div>block</div> text", "block text"),
+]
+
+
+class TestClean:
+    """Test Fast Text Clean Up."""
+
+    app = SemanticPatternFinder(load=False)
+
+    def test_same(self) -> None:
+        """Test same output as clean_up."""
+        for text in SAME:
+            assert clean_text(text) == self.app.clean_up(text), text
+
+    def test_different(self) -> None:
+        """Test known differences from clean_up."""
+        for text, fast in DIFFERENT:
+            assert clean_text(text) == fast, text
+            assert self.app.clean_up(text) != fast, text
+
+    @staticmethod
+    def test_batch() -> None:
+        """Test batch in process pool."""
+        texts = SAME * 10
+        assert clean_texts(texts, n_process=2, chunksize=8) == [clean_text(text) for text in texts]
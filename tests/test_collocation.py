@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test Skip-grams and Collocation Scores."""
+
+import math
+import random
+from collections import Counter
+
+import numpy as np
+import spacy
+
+from ..core.collocation import CollocationCounter
+from ..core.ngrams import NgramComponent, SkipgramComponent
+from .test_ngrams import make_doc
+
+
+WORDS = ["quark", "soup", "gluon", "assembly", "boson", "field", "spin", "charm"]
+
+
+class TestCollocation:
+    """Test Skip-grams and Collocations."""
+
+    @staticmethod
+    def test_skipgrams() -> None:
+        """Test skip-grams in pipeline, gap zero gives bigrams, hashed ids match strings."""
+        nlp = spacy.blank("en")
+        nlp.add_pipe("spacy-skipgram", config={"gap": 1})
+        doc = make_doc(nlp, "quark soup is hot gluons")
+        nlp.get_pipe("spacy-skipgram")(doc)
+        assert doc._.skipgram_2 == ["quark_soup", "quark_hot", "soup_hot", "soup_gluon", "hot_gluon"]
+
+        doc = make_doc(nlp, "quark soup hot gluon field")
+        bigrams = NgramComponent(nlp, "ngram", ngrams=(2,), hashed=True)(doc)._.ngram_2
+        skipgrams = SkipgramComponent(nlp, "skipgram", gap=0, hashed=True)(doc)._.skipgram_2
+        assert (skipgrams == bigrams).all()
+
+        strings = SkipgramComponent(nlp, "skipgram", gap=2)(doc)._.skipgram_2
+        hashed = SkipgramComponent(nlp, "skipgram", gap=2, hashed=True)(doc)._.skipgram_2
+        assert len(hashed) == len(strings) == 9
+        assert len(set(zip(strings, hashed.tolist()))) == len(set(strings)) == len(set(hashed.tolist()))
+        assert len(SkipgramComponent(nlp, "skipgram", gap=3, hashed=True)(nlp("quark"))._.skipgram_2) == 0
+
+    @staticmethod
+    def test_scores() -> None:
+        """Test counts over batches equal exact counts, scores equal contingency table formulas."""
+        nlp = spacy.blank("en")
+        app = SkipgramComponent(nlp, "skipgram", gap=2, hashed=True)
+        strings = SkipgramComponent(nlp, "skipgram", gap=2)
+        rnd = random.Random(5)
+        texts = [" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 10))) for _ in range(200)]
+        texts += ["quark soup"] * 30
+
+        counter = CollocationCounter(gap=2, batch_size=50)
+        counter.update_many(app(make_doc(nlp, text)) for text in texts[:120])
+        counter.update_many(app(make_doc(nlp, text)) for text in texts[120:])
+        exact = Counter(word for text in texts for word in strings(make_doc(nlp, text))._.skipgram_2)
+        assert counter.total == sum(exact.values())
+
+        n = sum(exact.values())
+        collocations = counter.top(k=len(exact))
+        assert {x.words: x.count for x in collocations} == exact
+        assert counter.top(1, by="count")[0].words == "quark_soup"
+        assert [x.llr for x in collocations] == sorted((x.llr for x in collocations), reverse=True)
+        for x in collocations[:10]:
+            first, second = x.words.split("_")
+            c12 = exact[x.words]
+            c1 = sum(c for word, c in exact.items() if word.split("_")[0] == first)
+            c2 = sum(c for word, c in exact.items() if word.split("_")[1] == second)
+            table = [(c12, c1, c2), (c1 - c12, c1, n - c2), (c2 - c12, n - c1, c2), (n - c1 - c2 + c12, n - c1, n - c2)]
+            llr = 2 * sum(k * math.log(k * n / (row * col)) for k, row, col in table if k)
+            assert np.isclose(x.pmi, math.log2(c12 * n / (c1 * c2)))
+            assert np.isclose(x.llr, llr)
+            assert np.isclose(x.t_score, (c12 - c1 * c2 / n) / math.sqrt(c12))
+        assert all(x.count >= 20 for x in counter.top(by="pmi", min_count=20))
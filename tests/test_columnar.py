@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test Columnar Storage."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ..base.io import IO
+from ..run.columnar import ColumnarReader, ColumnarWriter
+
+
+def make_record(i: int) -> dict:
+    """Content record as saved in json lines, i + 1 sentences of i + 2 tokens."""
+    sents = []
+    for j in range(i + 1):
+        words = [f"w{i}_{j}_{k}" for k in range(i + 2)]
+        sents.append({
+            "text": " ".join(words) + " ü.",
+            "lem": words,
+            "ent": {f"Ent {i} {j}": "ORG"} if j % 2 == 0 else {},
+            "pos": ["NOUN"] * len(words),
+            "tag": ["NN"] * len(words),
+            "dep": ["dep"] * len(words),
+            "emotion": {"tag": "joy" if j % 2 else "anger", "emoji": ""},
+            "sentiment": {"polarity": 0.25 * j, "subjectivity": 0.5},
+            "logic": j == 0,
+            "topic": bool(i % 2),
+        })
+    return {"cid": f"c{i}", "type": "comment", "parent": f"s{i}", "sents": sents}
+
+
+class TestColumnar:
+    """Test Columnar Writer and Reader."""
+
+    dir_test = Path(__file__).parent / "test"
+
+    def test_round_trip(self) -> None:
+        """Test records written across parts read back with rebased offsets."""
+        records = [make_record(i) for i in range(6)]
+        dir_out = self.dir_test / "columnar"
+        with ColumnarWriter(dir_out, part_size=4) as writer:
+            for record in records:
+                writer.write(record)
+        assert writer.parts == 4
+
+        reader = ColumnarReader(dir_out)
+        assert len(list(reader.iter_parts())) == 4
+        table = reader.load()
+        sents = [sent for record in records for sent in record["sents"]]
+        assert len(table["emotion"]) == len(sents) == 21
+        assert table["sent_offsets"].tolist() == [0, 1, 3, 6, 10, 15, 21]
+        assert reader.decode(table["cid"]) == [record["cid"] for record in records]
+        assert reader.decode(table["parent"]) == [record["parent"] for record in records]
+
+        for index, sent in enumerate(sents):
+            assert reader.get_text(table, index) == sent["text"]
+            for column in ("lem", "pos", "tag", "dep"):
+                assert reader.get_tokens(table, column, index) == sent[column]
+            start, end = table["ent_offsets"][index], table["ent_offsets"][index + 1]
+            ents = dict(zip(reader.decode(table["ent_text"][start:end]), reader.decode(table["ent_label"][start:end])))
+            assert ents == sent["ent"]
+            assert reader.decode(table["emotion"][index:index + 1]) == [sent["emotion"]["tag"]]
+            assert table["polarity"][index] == np.float32(sent["sentiment"]["polarity"])
+            assert (table["logic"][index], table["topic"][index]) == (sent["logic"], sent["topic"])
+        assert table["token_offsets"][-1] == len(table["lem"]) == sum(len(sent["lem"]) for sent in sents)
+
+    def test_replace(self) -> None:
+        """Test writer replaces columnar output only, keeps it on error."""
+        dir_out = self.dir_test / "columnar-replace"
+        IO.dir_del(dir_out)
+        with ColumnarWriter(dir_out, part_size=4) as writer:
+            writer.write(make_record(1))
+        with ColumnarWriter(dir_out, part_size=4) as writer:
+            writer.write(make_record(2))
+        assert ColumnarReader(dir_out).decode(ColumnarReader(dir_out).load()["cid"]) == ["c2"]
+
+        with pytest.raises(RuntimeError):
+            with ColumnarWriter(dir_out, part_size=4) as writer:
+                writer.write(make_record(3))
+                raise RuntimeError("crash")
+        assert ColumnarReader(dir_out).decode(ColumnarReader(dir_out).load()["cid"]) == ["c2"]
+        assert not writer.dir_tmp.exists()
+
+        dir_data = self.dir_test / "data"
+        IO.dir_create(dir_data)
+        IO.save_list(dir_data / "keep.json", ["keep"])
+        with pytest.raises(ValueError):
+            ColumnarWriter(dir_data)
+        assert IO.load_list(dir_data / "keep.json") == ["keep"]
+
+    def test_cleanup(self) -> None:
+        """Test clean up test dir."""
+        assert IO.dir_del(dir_name=self.dir_test)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test Streaming n-gram Counter."""
+
+import pickle
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+import spacy
+
+from ..core.counts import CountMinSketch, NgramCounter
+from ..core.ngrams import NgramComponent
+from .test_ngrams import make_doc
+
+
+WORDS = ["quark", "soup", "gluon", "assembly", "localized", "boson", "field", "spin", "charm", "decay"]
+
+
+class TestCounts:
+    """Test n-gram Counter."""
+
+    @staticmethod
+    def get_docs(size: int = 300) -> tuple[NgramComponent, list]:
+        """Docs of random words with hashed ngrams at doc level."""
+        nlp = spacy.blank("en")
+        app = NgramComponent(nlp, "ngram", ngrams=(2, 3), hashed=True)
+        rnd = random.Random(7)
+        texts = [" ".join(rnd.choice(WORDS[:rnd.randint(3, 10)]) for _ in range(rnd.randint(2, 12)))
+                 for _ in range(size)]
+        return app, [app(make_doc(nlp, text)) for text in texts]
+
+    @staticmethod
+    def test_sketch() -> None:
+        """Test sketch never under counts, merge adds tables."""
+        ids = np.random.default_rng(1).integers(0, 1 << 63, size=5000, dtype=np.uint64)
+        counts = np.arange(1, 5001)
+        sketch = CountMinSketch(width=1024, depth=4)
+        sketch.add(ids, counts)
+        assert (sketch.query(ids) >= counts).all()
+        other = CountMinSketch(width=1000, depth=4)
+        other.add(ids, counts)
+        sketch.merge(other)
+        assert (sketch.query(ids) >= 2 * counts).all()
+        with pytest.raises(ValueError):
+            sketch.merge(CountMinSketch(width=1024, depth=4, seed=1))
+
+    def test_top(self) -> None:
+        """Test top-k per order equals exact counts of strings, with small batches."""
+        app, docs = self.get_docs()
+        counter = NgramCounter(top_k=5, batch_size=50).update_many(docs)
+        for count in (2, 3):
+            exact = Counter(word for doc in docs for word in app.to_strings(doc, count))
+            top = counter.top(count)
+            assert [c for _, c in top] == [c for _, c in exact.most_common(5)]
+            assert all(exact[word] == c for word, c in top)
+            assert counter.total[count] == sum(exact.values())
+
+    def test_merge(self) -> None:
+        """Test merge of counters from pickled shards equals one counter."""
+        _, docs = self.get_docs()
+        whole = NgramCounter(top_k=20).update_many(docs)
+        first = NgramCounter(top_k=20).update_many(docs[:100])
+        second = NgramCounter(top_k=20).update_many(docs[100:])
+        merged = pickle.loads(pickle.dumps(first)).merge(pickle.loads(pickle.dumps(second)))
+        assert merged.export(10) == whole.export(10)
+        assert merged.total == whole.total
+
+    @staticmethod
+    def test_not_hashed() -> None:
+        """Test error on docs without hashed ngrams."""
+        nlp = spacy.blank("en")
+        doc = NgramComponent(nlp, "ngram", ngrams=(2, 3))(nlp("quark soup is hot"))
+        with pytest.raises(ValueError):
+            NgramCounter().update(doc)
@@ -4,14 +4,113 @@
 """Test Emotion Detection."""
 
 from datetime import datetime
-from typing import Callable
+from pathlib import Path
+from typing import Callable, Union
 
-from ..core.emotion import Emotion, EmotionDetectorT5, EmotionDetectorRoberta
+import pytest
+import torch
+from transformers import BertConfig, BertForSequenceClassification, BertTokenizer, T5Config, T5ForConditionalGeneration
+
+from ..base.io import IO
+from ..core.registry import REGISTRY
+from ..core.emotion import Emotion, EmotionScore, EmotionDetectorT5, EmotionDetectorRoberta
 
 
 class TestEmotionDetector:
     """Test Emotion Detector."""
 
+    dir_test = Path(__file__).parent / "test"
+
+    def get_tiny_t5(self, words: list[str]) -> str:
+        """Save tiny random T5 with word level tokenizer, return model dir."""
+        dir_model = self.dir_test / f"tiny-t5-{len(words)}"
+        IO.dir_create(dir_model)
+        (dir_model / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]"] + words))
+        BertTokenizer(str(dir_model / "vocab.txt"), model_max_length=32).save_pretrained(dir_model)
+        config = T5Config(vocab_size=len(words) + 4, d_model=16, d_kv=8, d_ff=32, num_layers=1, num_heads=2, decoder_start_token_id=0)
+        torch.manual_seed(0)
+        T5ForConditionalGeneration(config).save_pretrained(dir_model)
+        return str(dir_model)
+
+    def test_label_ids(self) -> None:
+        """Test labels must be single tokens with unique ids."""
+        labels = list(EmotionDetectorT5.labels)
+        nlp = EmotionDetectorT5(model_name=self.get_tiny_t5(labels))
+        assert nlp.label_ids == [4, 5, 6, 7, 8, 9]
+        with pytest.raises(ValueError, match="not unique"):
+            EmotionDetectorT5(model_name=self.get_tiny_t5(labels[:4]))
+        with pytest.raises(ValueError, match="single token"):
+            EmotionDetectorT5(model_name=self.get_tiny_t5(labels[:5] + ["sur", "##prise"]))
+
+    def test_fit_temperature(self) -> None:
+        """Test fitted temperature sharpens scores towards the model's own tags."""
+        words = list(EmotionDetectorT5.labels) + ["i", "am", "so", "angry", "sad", "happy", "what", "a", "lovely", "day"]
+        nlp = EmotionDetectorT5(model_name=self.get_tiny_t5(words))
+        texts = ["i am so angry", "i am sad", "what a lovely day", "i am so happy", "a sad day", "so lovely"]
+        scores = nlp.score_many(texts, batch_size=4)
+        tags = [score.tag for score in scores]
+
+        temperature = nlp.fit_temperature(texts, tags, batch_size=4)
+        assert nlp.temperature == temperature < 1
+        fitted = nlp.score_many(texts, batch_size=4)
+        assert [score.tag for score in fitted] == tags
+        assert all(getattr(x, tag) > getattr(y, tag) for x, y, tag in zip(fitted, scores, tags))
+        with pytest.raises(ValueError):
+            nlp.fit_temperature(texts[:1], ["neutral"])
+
+    def test_fetch_once(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test batch calls fetch model and tokenizer once, not per bucket."""
+        words = list(EmotionDetectorT5.labels) + ["i", "am", "so", "sad"]
+        nlp = EmotionDetectorT5(model_name=self.get_tiny_t5(words))
+        calls = []
+        get = REGISTRY.get
+        monkeypatch.setattr(REGISTRY, "get", lambda kind, name, **options: calls.append(kind) or get(kind, name, **options))
+        texts = ["i", "i am", "i am so", "i am so sad", "so sad", "sad"]
+        nlp.get_many(texts, batch_size=2)
+        nlp.score_many(texts, batch_size=2)
+        assert sorted(calls) == ["lm", "lm", "tokenizer", "tokenizer"]
+
+    def get_tiny_roberta(self) -> str:
+        """Save tiny random sequence classifier with word level tokenizer, return model dir."""
+        dir_model = self.dir_test / "tiny-classifier"
+        words = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "i", "am", "so", "angry", "sad", "happy", "what", "a", "lovely", "day", "surprise"]
+        IO.dir_create(dir_model)
+        (dir_model / "vocab.txt").write_text("\n".join(words))
+        BertTokenizer(str(dir_model / "vocab.txt"), model_max_length=16).save_pretrained(dir_model)
+        labels = ["joy", "sadness", "anger", "surprise", "love"]
+        config = BertConfig(
+            vocab_size=len(words), hidden_size=16, num_hidden_layers=1, num_attention_heads=2, intermediate_size=32,
+            max_position_embeddings=16, initializer_range=1.0, id2label=dict(enumerate(labels)), label2id={x: i for i, x in enumerate(labels)},
+        )
+        torch.manual_seed(1)
+        model = BertForSequenceClassification(config)
+        model.bert.pooler.dense.weight.data *= 0.1  # keep pooler out of saturation, labels differ by text
+        model.save_pretrained(dir_model)
+        return str(dir_model)
+
+    def test_roberta_batch(self) -> None:
+        """Test get_many and iter_emotions equal get in input order, also for empty and too long input."""
+        nlp = EmotionDetectorRoberta(model_name=self.get_tiny_roberta())
+        texts = [
+            "i am so angry",
+            "what a lovely day " * 10,
+            "sad",
+            "i am happy",
+            "what a surprise",
+            "so so so sad day",
+            "lovely",
+        ]
+        expected = [nlp.get(text) for text in texts]
+        assert len({emo.tag for emo in expected}) > 1
+        assert nlp.get_many(texts, batch_size=3) == expected
+        assert list(nlp.iter_emotions(iter(texts), batch_size=2, buffer=2)) == expected
+        assert nlp.get_many([]) == []
+        assert list(nlp.iter_emotions(iter([]))) == []
+
+    def test_cleanup(self) -> None:
+        """Test clean up test dir."""
+        assert IO.dir_del(dir_name=self.dir_test)
+
     def run_test(self, func: Callable, text: str) -> None:
         """Run Test."""
         start_time = datetime.now()
@@ -22,6 +121,26 @@ class TestEmotionDetector:
         print(type(emo), emo.tag)
         print('Duration: {}'.format(end_time - start_time))
 
+    def run_batch(self, nlp: Union[EmotionDetectorT5, EmotionDetectorRoberta], texts: list[str]) -> list[Emotion]:
+        """Run batched detection against single text calls."""
+        start_time = datetime.now()
+        emos = nlp.get_many(texts, batch_size=2)
+        end_time = datetime.now()
+        assert len(emos) == len(texts)
+        assert all(isinstance(emo, Emotion) for emo in emos)
+        assert [emo.tag for emo in emos] == [nlp.get(text).tag for text in texts]
+        print('Batch Duration: {}'.format(end_time - start_time))
+        return emos
+
+    def run_score(self, nlp: EmotionDetectorT5, texts: list[str]) -> None:
+        """Run single decoder step scoring against generate."""
+        scores = nlp.score_many(texts, batch_size=2)
+        for text, score in zip(texts, scores):
+            assert isinstance(score, EmotionScore)
+            assert abs(sum(getattr(score, key) for key in nlp.labels) - 1) < 1e-4
+            assert score.tag == nlp.get(text).tag
+            print(text, score)
+
     def run(self) -> None:
         """Run."""
         texts = [
@@ -32,10 +151,18 @@ class TestEmotionDetector:
         for text in texts:
             self.run_test(nlp_t5.get, text)
 
+        texts_batch = texts + ["i am so angry right now", "what a lovely surprise"]
+        self.run_batch(nlp_t5, texts_batch)
+        self.run_score(nlp_t5, texts_batch)
+
         nlp_rb = EmotionDetectorRoberta()
         for text in texts:
             self.run_test(nlp_rb.get, text)
 
+        emos = self.run_batch(nlp_rb, texts_batch)
+        emos_iter = nlp_rb.iter_emotions(iter(texts_batch), batch_size=2, buffer=1)
+        assert [emo.tag for emo in emos_iter] == [emo.tag for emo in emos]
+
 
 if __name__ == "__main__":
     TestEmotionDetector().run()
\ No newline at end of file
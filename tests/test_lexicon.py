@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test Lexicon Flags Component."""
+
+from pathlib import Path
+
+import spacy
+
+from ..base.io import IO
+from ..core.lexicon import LexiconComponent, load_lexicon
+
+
+class TestLexicon:
+    """Test Lexicon Flags."""
+
+    dir_test = Path(__file__).parent / "test"
+
+    @staticmethod
+    def test_match() -> None:
+        """Test single and multiword entries, overlapping matches."""
+        app = LexiconComponent({
+            "logic": ["why", "how", "how to"],
+            "topic": ["best", "best way", "way to go", "to do list"],
+        })
+        words = "the best way to go is how to make a to do list".split()
+        hits = app.match(words)
+        assert hits["logic"] == [6, 7]
+        assert hits["topic"] == [1, 2, 3, 4, 10, 11, 12]
+
+    @staticmethod
+    def test_extensions() -> None:
+        """Test token, span and doc flags from pipeline."""
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        nlp.add_pipe("lexicon_flags", config={
+            "lexicons": {"logic": ["why", "how"], "topic": ["secret recipe"]},
+            "attr": "lower",
+        })
+        doc = nlp("Why not. Try this. The Secret Recipe works.")
+        first, second, third = doc.sents
+        assert doc[0]._.is_logic and not doc[1]._.is_logic
+        assert [tk._.is_topic for tk in third] == [False, True, True, False, False]
+        assert (first._.has_logic, second._.has_logic, third._.has_logic) == (True, False, False)
+        assert (first._.has_topic, second._.has_topic, third._.has_topic) == (False, False, True)
+        assert doc._.has_logic and doc._.has_topic
+        assert not nlp.make_doc("Why")._.has_logic
+
+    @staticmethod
+    def test_two_components() -> None:
+        """Test second component keeps hits of the first."""
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        nlp.add_pipe("lexicon_flags", name="logic_flags", config={"lexicons": {"logic": ["why"]}, "attr": "lower"})
+        nlp.add_pipe("lexicon_flags", name="topic_flags", config={"lexicons": {"topic": ["app"]}, "attr": "lower"})
+        doc = nlp("Why this app. Why not.")
+        first, second = doc.sents
+        assert set(doc._.lexicon_hits) == {"logic", "topic"}
+        assert doc._.has_logic and doc._.has_topic
+        assert [tk._.is_logic for tk in doc] == [True, False, False, False, True, False, False]
+        assert (first._.has_topic, second._.has_topic) == (True, False)
+
+    def test_files(self) -> None:
+        """Test load lexicon from text and json files."""
+        IO.dir_create(self.dir_test)
+        file_txt = self.dir_test / "logic.txt"
+        file_txt.write_text("# logic words\nwhy\n\nHow come\n", encoding="utf8")
+        file_json = self.dir_test / "topic.json"
+        IO.save_list(file_json, ["best", "top"])
+        assert load_lexicon(file_txt) == ["why", "How come"]
+        assert load_lexicon(file_json) == ["best", "top"]
+
+        nlp = spacy.blank("en")
+        nlp.add_pipe("lexicon_flags", config={
+            "files": {"logic": str(file_txt), "topic": str(file_json)},
+            "attr": "lower",
+        })
+        doc = nlp("how come this is top")
+        assert [tk._.is_logic for tk in doc] == [True, True, False, False, False]
+        assert [tk._.is_topic for tk in doc] == [False, False, False, False, True]
+
+    def test_cleanup(self) -> None:
+        """Test clean up test dir."""
+        assert IO.dir_del(dir_name=self.dir_test)
@@ -5,12 +5,25 @@
 
 # Reference: https://github.com/kpwhri/spacy-ngram#usage
 
+import random
+import time
+
+import numpy as np
 import spacy
+from spacy.tokens import Doc
 
 # from spacy_ngram import NgramComponent
 from ..core.ngrams import create_ngram_component, NgramComponent
 
 
+def make_doc(nlp: spacy.language.Language, text: str) -> Doc:
+    """Make Doc with lemma as lowercase text, as blank pipeline has no lemmatizer."""
+    doc = nlp(text)
+    for token in doc:
+        token.lemma_ = token.text.rstrip("s") if token.text.endswith("s") else token.text
+    return doc
+
+
 class TestNGrams:
     """Test n-grams."""
 
@@ -49,6 +62,105 @@ class TestNGrams:
         print(sentence._.ngram_2)  # returns list of bigrams
         print(sentence._.ngram_3)  # returns list of trigrams
 
+    @staticmethod
+    def test_hashed() -> None:
+        """Test hashed ngram ids give same ngrams as string mode."""
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        text = "Quark soup is an interacting localized assembly of Quarks and gluons. Quark soup again!"
+        options = {"ngrams": (1, 2, 3), "include_bos": True, "sentence_level": True, "doc_level": True}
+        strings = NgramComponent(nlp, "ngram", **options)(make_doc(nlp, text))
+        hashed = NgramComponent(nlp, "ngram", hashed=True, **options)(make_doc(nlp, text))
+        app = NgramComponent(nlp, "ngram", hashed=True, **options)
+
+        for count in (1, 2, 3):
+            ids = hashed._.get(f"ngram_{count}")
+            assert ids.dtype == np.uint64
+            assert app.to_strings(hashed, count) == strings._.get(f"ngram_{count}")
+        for word, x in zip(app.to_strings(hashed, 2), hashed._.ngram_2):
+            assert (word == "quark_soup") == (x == hashed._.ngram_2[1])
+        for sent in hashed.sents:
+            assert len(sent._.ngram_3) == len(sent._.ngram_ids) - 2
+
+    @staticmethod
+    def test_words() -> None:
+        """Test vectorized keep mask and lemma ids give same words as itertokens."""
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        text = "The 3 Quarks, and THE gluons! Why is soup hot? Nothing 42 here. Because Assembly is done"
+        doc = make_doc(nlp, text)
+        doc[-1].lemma_ = "Nothing"
+        for bos, eos in ((False, False), (True, True)):
+            app = NgramComponent(nlp, "ngram", ngrams=(1, 2), include_bos=bos, include_eos=eos)
+            keep, ids = app.get_words(doc)
+            for sequence in (doc, *doc.sents):
+                words = [doc.vocab.strings[x] for x in app.get_sequence_ids(sequence, keep, ids).tolist()]
+                assert words == list(app.itertokens(sequence))
+        assert app.get_words(nlp(""))[0].shape == (0,)
+
+    @staticmethod
+    def test_sparse() -> None:
+        """Test CSR matrix of hashed ngrams: built, fixed and hashed vocab, tf/idf."""
+        nlp = spacy.blank("en")
+        texts = ["quark soup gluon soup", "quark soup hot", "", "boson field quark soup"]
+        app = NgramComponent(nlp, "ngram", ngrams=(1, 2), hashed=True)
+        docs = [app(make_doc(nlp, text)) for text in texts]
+
+        sparse = app.to_sparse(docs)
+        columns = {}
+        for doc in docs:
+            for count in (1, 2):
+                for word, x in zip(app.to_strings(doc, count), doc._.get(f"ngram_{count}").tolist()):
+                    columns[word] = sparse.vocab[x]
+        dense = sparse.matrix.toarray()
+        assert dense.shape == (4, len(columns))
+        assert dense[0, columns["soup"]] == 2 and dense[0, columns["quark_soup"]] == 1
+        assert dense[2].sum() == 0 and dense[3, columns["boson_field"]] == 1
+
+        strings = NgramComponent(nlp, "ngram", ngrams=(1, 2))
+        fixed = strings.to_sparse([make_doc(nlp, "soup boson quark")], vocab=sparse.vocab).matrix.toarray()
+        assert fixed.shape == (1, len(columns)) and fixed.sum() == 3
+        assert fixed[0, columns["soup"]] == fixed[0, columns["boson"]] == fixed[0, columns["quark"]] == 1
+
+        hashed = app.to_sparse(docs, vocab=1 << 10, ngrams=(2,)).matrix
+        assert hashed.shape == (4, 1 << 10)
+        assert hashed.sum(axis=1).ravel().tolist() == [[3, 2, 0, 3]]
+
+        tfidf = app.to_sparse(docs, tfidf=True)
+        df = (dense > 0).sum(axis=0)
+        weights = dense[0] * (np.log(5 / (1 + df)) + 1)
+        assert np.allclose(tfidf.matrix.toarray()[0], weights / np.linalg.norm(weights))
+        again = app.to_sparse(docs[:1], vocab=tfidf.vocab, tfidf=True, idf=tfidf.idf).matrix
+        assert np.allclose(again.toarray(), tfidf.matrix.toarray()[:1])
+
+    @staticmethod
+    def benchmark_words(size: int = 5000) -> None:
+        """Benchmark token by token itertokens against vectorized get_words, both levels."""
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        rnd = random.Random(0)
+        vocab = sorted(nlp.Defaults.stop_words)[:100] + [f"word{i}" for i in range(2000)] + [",", ".", "7"]
+        docs = [make_doc(nlp, " ".join(rnd.choice(vocab) for _ in range(60)) + ".") for _ in range(size)]
+        app = NgramComponent(nlp, "ngram", ngrams=(1, 2, 3), sentence_level=True, hashed=True)
+
+        start = time.perf_counter()
+        for doc in docs:
+            for sequence in (*doc.sents, doc):
+                list(app.itertokens(sequence))
+        print(f"itertokens: {time.perf_counter() - start:.3f}s")
+
+        start = time.perf_counter()
+        for doc in docs:
+            keep, ids = app.get_words(doc)
+            for sequence in (*doc.sents, doc):
+                app.get_sequence_ids(sequence, keep, ids)
+        print(f"get_words: {time.perf_counter() - start:.3f}s")
+
+        start = time.perf_counter()
+        for doc in docs:
+            app(doc)
+        print(f"component: {time.perf_counter() - start:.3f}s")
+
     def run(self) -> None:
         """Run."""
         self.example_one()
@@ -56,4 +168,4 @@ class TestNGrams:
 
     
 if __name__ == "__main__":
-    TestNGrams().run()
\ No newline at end of file
+    TestNGrams().run()
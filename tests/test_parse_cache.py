@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test Parse Cache."""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import spacy
+
+from ..base.io import IO
+from ..core.parse_cache import ParseCache
+
+
+class TestParseCache:
+    """Test Parse Cache."""
+
+    dir_test = Path(__file__).parent / "test"
+
+    def test_pipe(self) -> None:
+        """Test reruns load Docs from shards, in input order."""
+        dir_cache = self.dir_test / "docbin"
+        IO.dir_del(dir_cache)
+
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        texts = [f"Text number {i}. It has two sentences." for i in range(7)]
+
+        cache = ParseCache(nlp, dir_cache=dir_cache, shard_size=3)
+        docs = list(cache.pipe(texts[:2] + texts[:1], batch_size=2))
+        docs += list(cache.pipe(texts[2:], batch_size=2))
+        assert [doc.text for doc in docs] == texts[:2] + texts[:1] + texts[2:]
+        assert cache.stats == {"hit": 1, "miss": 7}
+        assert cache.shards == 2
+        cache.close()
+        assert cache.shards == 3
+        assert sum(len(IO.load_list(file)) for file in cache.dir_cache.glob("*.keys")) == 7
+
+        cache = ParseCache(nlp, dir_cache=dir_cache, shard_size=3)
+        items = [(text, i) for i, text in enumerate(texts[::-1] + ["A new text. Yes."])]
+        docs = list(cache.pipe(items, as_tuples=True, batch_size=3))
+        assert [(doc.text, i) for doc, i in docs] == items
+        assert [len(list(doc.sents)) for doc, _ in docs] == [2] * 8
+        assert cache.stats == {"hit": 7, "miss": 1}
+        cache.close()
+
+        nlp.add_pipe("merge_entities")
+        cache = ParseCache(nlp, dir_cache=dir_cache)
+        list(cache.pipe(texts))
+        assert cache.stats == {"hit": 0, "miss": 7}
+
+    def test_threads(self) -> None:
+        """Test one cache shared by threads saves each Doc under its own key."""
+        dir_cache = self.dir_test / "docbin-threads"
+        IO.dir_del(dir_cache)
+
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        texts = [f"Text number {i}. " + "It has more words. " * (i % 5) for i in range(400)]
+        chunks = [texts[i::4] + texts[:20] for i in range(4)]
+
+        cache = ParseCache(nlp, dir_cache=dir_cache, shard_size=7)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda chunk: [doc.text for doc in cache.pipe(chunk, batch_size=3)], chunks))
+        cache.close()
+        assert results == chunks
+        assert cache.stats["hit"] + cache.stats["miss"] == sum(map(len, chunks))
+
+        cache = ParseCache(nlp, dir_cache=dir_cache)
+        assert len(cache.index) == len(texts)
+        assert [doc.text for doc in cache.pipe(texts)] == texts
+        assert cache.stats == {"hit": len(texts), "miss": 0}
+
+    def test_cleanup(self) -> None:
+        """Test clean up test dir."""
+        assert IO.dir_del(dir_name=self.dir_test)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test Semantic Pattern Finder Runs."""
+
+from pathlib import Path
+
+import pytest
+import spacy
+
+from ..base.io import IO
+from ..config import Config
+from ..core.emotion import Emotion
+from ..core.lexicon import LexiconComponent
+from ..core.parse_cache import ParseCache
+from ..core.sentiment import Sentiment, SentimentAnalysis
+from ..run.pats import SemanticPatternFinder
+
+
+class FakeDetector:
+    """Fake emotion detector, raises on call number `crash_at`."""
+
+    def __init__(self, crash_at: int = 0) -> None:
+        """Init."""
+        self.crash_at = crash_at
+        self.calls = 0
+        self.texts: list[str] = []
+
+    def get_many(self, texts: list[str]) -> list[Emotion]:
+        """Get Emotion from first word of each text."""
+        self.calls += 1
+        if self.calls == self.crash_at:
+            raise RuntimeError("crash")
+        self.texts.extend(texts)
+        return [Emotion(tag=text.split()[0].lower(), emoji="") for text in texts]
+
+
+class RecordingSentiment(SentimentAnalysis):
+    """Sentiment analysis recording texts it is called with."""
+
+    def __init__(self) -> None:
+        """Init."""
+        super().__init__()
+        self.texts: list[str] = []
+
+    def get_many(self, sentences: list[str], n_process: int = 1) -> list[Sentiment]:
+        """Record texts, then get list of Sentiment."""
+        self.texts.extend(sentences)
+        return super().get_many(sentences, n_process=n_process)
+
+
+class StubConfig(Config):
+    """Config writing into test dir."""
+
+    dir_tmp = Path(__file__).parent / "test"
+
+
+class StubFinder(SemanticPatternFinder):
+    """Pattern finder on blank pipeline and stub detectors, also in worker processes."""
+
+    config = StubConfig()
+
+    def load_models(self) -> None:
+        """Load blank pipeline and stub detectors."""
+        self.nlp = spacy.blank("en")
+        self.nlp.add_pipe("sentencizer")
+        self.app_ed = FakeDetector()
+        self.app_sa = SentimentAnalysis()
+
+
+def get_data(size: int = 12) -> list[dict]:
+    """Submissions with comments and replies."""
+    return [
+        {
+            "id": f"s{i}",
+            "title": f"Why is the best app number {i} for tracking mushrooms?",
+            "selftext": "I really love this app a lot. Bad things happen to good people always.",
+            "comments": [
+                {
+                    "id": f"c{i}",
+                    "parent_id": f"s{i}",
+                    "body": f"What a nice tool you have found here friend {i}.",
+                    "replies": [
+                        {"id": f"r{i}", "parent_id": f"c{i}", "body": "Thanks, this is a great guide for everyone!"},
+                    ],
+                },
+            ],
+        }
+        for i in range(size)
+    ]
+
+
+class TestSemanticPatternFinder:
+    """Test Semantic Pattern Finder on blank pipeline and stub detectors."""
+
+    dir_test = Path(__file__).parent / "test"
+
+    def get_finder(self, name: str, crash_at: int = 0) -> SemanticPatternFinder:
+        """Pattern finder writing into test dir."""
+        finder = SemanticPatternFinder(name=name, load=False)
+        finder.debug = False
+        finder.config = Config()
+        finder.config.dir_tmp = self.dir_test
+        finder.nlp = spacy.blank("en")
+        finder.nlp.add_pipe("sentencizer")
+        finder.app_ed = FakeDetector(crash_at=crash_at)
+        finder.app_sa = SentimentAnalysis()
+        return finder
+
+    def test_resume(self) -> None:
+        """Test crash then resume gives same output as uninterrupted run."""
+        data = get_data()
+        IO.dir_del(self.dir_test)
+
+        finder = self.get_finder("full")
+        assert finder.analysis(data, source="sr", commit_every=2, batch_size=4) == 36
+        expected = list(finder.load_results())
+        calls = finder.app_ed.calls
+
+        finder = self.get_finder("crash", crash_at=5)
+        with pytest.raises(RuntimeError):
+            finder.analysis(data, source="sr", commit_every=2, batch_size=4)
+        ckpt = finder.load_checkpoint()
+        assert 0 < ckpt["offset"] < len(data)
+
+        finder = self.get_finder("crash")
+        finder.analysis(data, source="sr", commit_every=2, batch_size=4)
+        assert list(finder.load_results()) == expected
+        assert finder.load_checkpoint()["offset"] == len(data)
+        assert finder.app_ed.calls < calls
+
+    def test_staged(self) -> None:
+        """Test staged pipeline gives same Content as streaming through iter_contents."""
+        data = get_data(size=5)
+        finder = self.get_finder("staged")
+        expected = list(finder.iter_contents(data, batch_size=3))
+        contents = list(finder.iter_contents_staged(data, batch_size=3, maxsize=2, workers=(1, 2, 2)))
+        assert contents == expected
+        assert [x.cid for x in contents][:4] == ["s0", "c0", "r0", "s1"]
+        assert all(report["items"] == 20 for report in finder.pipeline.report())
+
+    def test_staged_parse_cache(self) -> None:
+        """Test parse stage clamped to one worker, reruns from parse cache give same Content."""
+        data = get_data(size=20)
+        finder = self.get_finder("staged")
+        expected = list(finder.iter_contents(data, batch_size=3))
+
+        dir_cache = self.dir_test / "docbin"
+        IO.dir_del(dir_cache)
+        for _ in range(2):
+            finder = self.get_finder("staged")
+            finder.parse_cache = True
+            finder._parser = ParseCache(finder.nlp, dir_cache=dir_cache, shard_size=7)
+            contents = list(finder.iter_contents_staged(data, batch_size=3, workers=(4, 1, 1)))
+            finder._parser.close()
+            assert contents == expected
+            assert finder.pipeline.report()[0]["workers"] == 1
+        assert finder._parser.stats == {"hit": 80, "miss": 0}
+
+    def test_staged_close(self) -> None:
+        """Test stage threads exit when the consumer stops early."""
+        finder = self.get_finder("staged")
+        contents = finder.iter_contents_staged(get_data(size=50), batch_size=2, maxsize=1, workers=(1, 2, 2))
+        assert next(contents).cid == "s0"
+        contents.close()
+        assert not any(thread.is_alive() for thread in finder.pipeline.threads)
+
+    def test_sharded(self) -> None:
+        """Test output merged from 2 worker processes equals single process output."""
+        data = get_data(size=7)
+        finder = StubFinder(name="single")
+        finder.debug = False
+        finder.analysis(data, source="sr", resume=False)
+        expected = list(finder.load_results())
+        drops = finder.report_filters()
+
+        finder = StubFinder(name="sharded")
+        finder.debug = False
+        assert finder.split(data, workers=2) == [data[:4], data[4:]]
+        assert finder.split(data, workers=10) == [[sub] for sub in data]
+        assert finder.analysis_sharded(data, source="sr", workers=2) == len(expected) == 21
+        assert list(finder.load_results()) == expected
+        assert finder.report_filters() == drops == {"rubbish": 0, "kept": 35}
+        with pytest.raises(ValueError):
+            finder.analysis_sharded(data, source="sr", workers=0)
+
+    def test_prefilters(self) -> None:
+        """Test each prefilter counts its own drops, dropped sentences get no model calls."""
+        finder = self.get_finder("filters")
+        finder.prefilters = ("rubbish", "english", "relevant")
+        finder.lexicon = LexiconComponent({"logic": finder.logic_words, "topic": finder.topic_words}, attr="lower")
+        finder.app_sa = RecordingSentiment()
+        kept = ["Why is this the best tool for tracking?", "What a great guide you have found here."]
+        texts = [
+            "Too short.",
+            "Это очень хороший и полезный инструмент для всех.",
+            kept[0],
+            "The weather outside is quite cold today.",
+            kept[1],
+        ]
+        sentences = finder.process(texts)
+        assert [sent.text for sent in sentences] == kept
+        assert finder.report_filters() == {"rubbish": 1, "english": 1, "relevant": 1, "kept": 2}
+        assert finder.app_ed.texts == kept
+        assert finder.app_sa.texts == kept
+
+        finder.drops.clear()
+        finder.process(texts[:2] + texts[3:4])
+        assert finder.report_filters() == {"rubbish": 1, "english": 1, "relevant": 1, "kept": 0}
+        assert finder.app_ed.texts == kept
+
+    def test_cleanup(self) -> None:
+        """Test clean up test dir."""
+        assert IO.dir_del(dir_name=self.dir_test)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test Lexicon Polarity against TextBlob."""
+
+import random
+
+import spacy
+from textblob import TextBlob
+
+from ..core.polarity import PatternSentiment, load_pattern_lexicon
+from ..core.sentiment import SentimentAnalysis
+
+
+SENTENCES = [
+    "I really love this app a lot!",
+    "This is not a good idea.",
+    "Not really good (!)",
+    "What a terrible, horrible day :(",
+    "I'm very happy :-) <3",
+    "He isn't bad at all.",
+    "The U.S. economy is doing great...",
+    "Mr. Smith was extremely rude!!!",
+    "It was never boring, hardly perfect, but terribly fun.",
+    "“Amazing” food; the service wasn't.",
+    "",
+]
+
+
+class TestPolarity:
+    """Test Lexicon Polarity."""
+
+    @staticmethod
+    def get_texts() -> list[str]:
+        """Sentences and random mixes of lexicon, negation, modifier and emoticon words."""
+        rnd = random.Random(42)
+        words = sorted(load_pattern_lexicon())
+        extra = ["not", "no", "never", "n't", "don't", "really", "very", "the", "a", "is", "it",
+                 "!", "(!)", ":)", ":-(", "<3", ";)", ".", ",", "?", "...", "hardly", "terribly"]
+        texts = list(SENTENCES)
+        for _ in range(2000):
+            size = rnd.randint(1, 15)
+            texts.append(" ".join(rnd.choice(words if rnd.random() < 0.5 else extra) for _ in range(size)))
+        return texts
+
+    def test_parity(self) -> None:
+        """Test same polarity and subjectivity as TextBlob."""
+        app = PatternSentiment()
+        for text in self.get_texts():
+            blob = TextBlob(text)
+            assert app.score(text) == (blob.polarity, blob.subjectivity), text
+
+    def test_batch(self) -> None:
+        """Test batch in process pool and SentimentAnalysis."""
+        texts = self.get_texts()[:200]
+        scores = PatternSentiment.score_many(texts)
+        assert PatternSentiment.score_many(texts, n_process=2, chunksize=16) == scores
+        results = SentimentAnalysis().get_many(texts)
+        assert [(x.polarity, x.subjectivity) for x in results] == scores
+
+    @staticmethod
+    def test_doc() -> None:
+        """Test spacy tokens give same scores where tokenization agrees, not on contractions or (!)."""
+        nlp = spacy.blank("en")
+        app = PatternSentiment()
+        for text in (SENTENCES[0], SENTENCES[1], SENTENCES[3]):
+            assert app.score_doc(nlp(text)) == app.score(text), text
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Test Model Registry."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..core.registry import ModelRegistry
+
+
+class FakeModel:
+    """Fake model with fixed resident size."""
+
+    loads = 0
+
+    def __init__(self, name: str, size: int = 10) -> None:
+        """Init."""
+        FakeModel.loads += 1
+        self.name = name
+        self.data = bytearray(size)
+
+
+class SlowModel(FakeModel):
+    """Fake model taking a while to load."""
+
+    def __init__(self, name: str, event: threading.Event = None) -> None:
+        """Init, wait for event before loading."""
+        if event is not None:
+            event.wait(timeout=5)
+        super().__init__(name)
+
+
+class TestModelRegistry:
+    """Test Model Registry."""
+
+    @staticmethod
+    def get_registry(budget: int = 0) -> ModelRegistry:
+        """Get registry with fake loader."""
+        registry = ModelRegistry(budget=budget)
+        registry.loaders = dict(registry.loaders, fake=FakeModel, slow=SlowModel)
+        return registry
+
+    def test_shared(self) -> None:
+        """Test same name and options share one instance."""
+        registry = self.get_registry()
+        loads = FakeModel.loads
+        one = registry.get("fake", "one", size=10)
+        assert registry.get("fake", "one", size=10) is one
+        assert registry.get("fake", "one", size=20) is not one
+        assert FakeModel.loads == loads + 2
+
+        report = registry.report()
+        assert [item["name"] for item in report] == ["one", "one"]
+        assert all(item["load_time"] >= 0 and item["size"] > 0 for item in report)
+
+    def test_evict_budget(self) -> None:
+        """Test least recently used model evicted over budget."""
+        registry = self.get_registry()
+        registry.get("fake", "one")
+        registry.get("fake", "two")
+        registry.get("fake", "one")
+        registry.budget = registry.size - 1
+        evicted = registry.evict()
+        assert [entry.name for entry in evicted] == ["two"]
+        assert [item["name"] for item in registry.report()] == ["one"]
+
+        registry.get("fake", "three")
+        assert [item["name"] for item in registry.report()] == ["three"]
+
+    def test_evict_idle(self) -> None:
+        """Test idle models evicted."""
+        registry = self.get_registry()
+        registry.get("fake", "one")
+        time.sleep(0.05)
+        registry.get("fake", "two")
+        evicted = registry.evict_idle(seconds=0.03)
+        assert [entry.name for entry in evicted] == ["one"]
+
+    def test_load_outside_lock(self) -> None:
+        """Test loading one model blocks neither other models nor loads it twice."""
+        registry = self.get_registry()
+        one = registry.get("fake", "one")
+        event = threading.Event()
+        loads = FakeModel.loads
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(registry.get, "slow", "two", event=event) for _ in range(3)]
+            time.sleep(0.05)
+            start_time = time.perf_counter()
+            assert registry.get("fake", "one") is one
+            assert time.perf_counter() - start_time < 1
+            event.set()
+            models = [future.result() for future in futures]
+        assert all(model is models[0] for model in models)
+        assert FakeModel.loads == loads + 1
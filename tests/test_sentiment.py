@@ -4,13 +4,23 @@
 """Test Sentiment Analysis."""
 
 from datetime import datetime
+from pathlib import Path
 
+import spacy
+import torch
+from spacy.tokens import Doc
+from textblob import TextBlob
+from transformers import BertConfig, BertForSequenceClassification, BertTokenizer
+
+from ..base.io import IO
 from ..core.sentiment import Sentiment, AspectSentiment, SentimentAnalysis, AspectBasedSentimentAnalysis
 
 
 class TestSentimentAnalysis:
     """Test Sentiment Analysis."""
 
+    dir_test = Path(__file__).parent / "test"
+
     def get_sentiment(self) -> None:
         """Get Sentiment."""
         nlp = SentimentAnalysis()
@@ -49,6 +59,64 @@ class TestSentimentAnalysis:
             end_time = datetime.now()
             print('Duration: {}'.format(end_time - start_time))
 
+    def test_aspect_batch(self) -> None:
+        """Test sentence pair scores of get, get_aspects and get_batch agree, on a tiny random model."""
+        dir_model = self.dir_test / "tiny-absa"
+        words = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "the", "pan", "was", "not", "good", "bottom", "plate", "clean", "it", "took", "time"]
+        IO.dir_create(dir_model)
+        (dir_model / "vocab.txt").write_text("\n".join(words))
+        BertTokenizer(str(dir_model / "vocab.txt"), model_max_length=32).save_pretrained(dir_model)
+        config = BertConfig(vocab_size=len(words), hidden_size=16, num_hidden_layers=1, num_attention_heads=2, intermediate_size=32, num_labels=3)
+        torch.manual_seed(0)
+        BertForSequenceClassification(config).save_pretrained(dir_model)
+
+        nlp = AspectBasedSentimentAnalysis()
+        nlp.model_name = str(dir_model)
+        sentence = "the pan was not good the bottom"
+        aspects = ["pan", "bottom", "plate"]
+
+        results = nlp.get_aspects(sentence, aspects)
+        assert [result.aspect for result in results] == aspects
+        assert all(abs(x.positive + x.negative + x.neutral - 1) < 1e-4 for x in results)
+
+        pairs = [(sentence, aspect) for aspect in aspects]
+        pairs.append(("it took time to clean", "clean"))
+        results = nlp.get_batch(pairs, batch_size=2)
+        assert [result.aspect for result in results] == [aspect for _, aspect in pairs]
+        for (text, aspect), result in zip(pairs, results):
+            single = nlp.get(text, aspect)
+            assert abs(single.positive - result.positive) < 1e-5
+            assert abs(single.negative - result.negative) < 1e-5
+
+    @staticmethod
+    def test_aspect_pairs() -> None:
+        """Test (aspect, descriptor) pairs from dependency parse."""
+        words = ["The", "internet", "speed", "was", "not", "very", "good", ",", "but", "the", "delicious", "food", "helped", "."]
+        pos = ["DET", "NOUN", "NOUN", "AUX", "PART", "ADV", "ADJ", "PUNCT", "CCONJ", "DET", "ADJ", "NOUN", "VERB", "PUNCT"]
+        heads = [2, 2, 3, 3, 6, 6, 3, 3, 3, 11, 11, 12, 3, 3]
+        deps = ["det", "compound", "nsubj", "ROOT", "neg", "advmod", "acomp", "punct", "cc", "det", "amod", "nsubj", "conj", "punct"]
+        doc = Doc(spacy.blank("en").vocab, words=words, pos=pos, heads=heads, deps=deps)
+        assert SentimentAnalysis().get_aspect_pairs(doc) == [("internet speed", "not very good"), ("food", "delicious")]
+
+    @staticmethod
+    def test_nlp_get() -> None:
+        """Test spacytextblob sentiment on texts and on parsed Spans equals TextBlob."""
+        app = SentimentAnalysis()
+        sentences = ["I really love this app a lot!", "This is not a good idea.", "What a terrible day :(", ""]
+        expected = [Sentiment(polarity=x.polarity, subjectivity=x.subjectivity) for x in map(TextBlob, sentences)]
+        assert app.nlp.pipe_names == ["spacytextblob"]
+        assert app.nlp_get(sentences[0]) == expected[0]
+        assert app.nlp_get_many(sentences, batch_size=2) == expected
+
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        doc = nlp(" ".join(sentences[:3]))
+        assert app.nlp_get_docs(doc.sents) == expected[:3]
+
+    def test_cleanup(self) -> None:
+        """Test clean up test dir."""
+        assert IO.dir_del(dir_name=self.dir_test)
+
     def run(self) -> None:
         """Run."""
         self.get_sentiment()